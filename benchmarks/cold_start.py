@@ -0,0 +1,66 @@
+# benchmarks/cold_start.py
+"""Cold-start check: time from launching server.py to the first successful `/` healthcheck, against a budget.
+
+Runs the server with STARTUP_PROFILE=1 so its import and init breakdown is printed alongside.
+Usage: python benchmarks/cold_start.py --budget 3 --runs 3
+Exits non-zero when the slowest run exceeds the budget, so it can gate a deploy.
+"""
+import os
+import sys
+import time
+import signal
+import socket
+import argparse
+import subprocess
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0)); return s.getsockname()[1]
+
+
+def measure(timeout):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), STARTUP_PROFILE='1', PYTHONUNBUFFERED='1')
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'server.py'], cwd=ROOT, env=env, stdout=subprocess.PIPE,
+                            stderr=subprocess.STDOUT, text=True, start_new_session=True)
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None: raise RuntimeError(f"server.py exited early:\n{proc.stdout.read()}")
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1) as response:
+                    if response.status == 200: return time.perf_counter() - started, proc
+            except OSError:
+                time.sleep(0.05)
+        raise RuntimeError(f"no healthcheck response within {timeout}s")
+    finally:
+        # server.py also starts the bot worker process; stop the whole session.
+        try: os.killpg(proc.pid, signal.SIGTERM)
+        except ProcessLookupError: pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--budget', type=float, default=3.0, help='seconds allowed to the first healthcheck')
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    timings = []
+    for run in range(args.runs):
+        elapsed, proc = measure(args.timeout)
+        output, _ = proc.communicate(timeout=10)
+        timings.append(elapsed)
+        print(f"run {run + 1}: first healthcheck after {elapsed:.2f}s")
+        if run == 0: print('\n'.join(line for line in output.splitlines() if line.startswith('[Startup]')))
+    worst = max(timings)
+    print(f"slowest {worst:.2f}s, budget {args.budget:.2f}s: {'OK' if worst <= args.budget else 'OVER BUDGET'}")
+    sys.exit(0 if worst <= args.budget else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,157 @@
+# benchmarks/delivery_harness.py
+"""Runs the report outbox (DeliveryQueue) against a local SMTP sink and a fake Drive endpoint that fails first.
+
+Checks retry with backoff, SMTP connection reuse across queued emails, and that nothing is dropped.
+Needs the server's dependencies (eventlet, Flask-SocketIO, google-api-python-client).
+Usage: python benchmarks/delivery_harness.py --emails 3 --drive-failures 1 --base-delay 0.5
+Exits non-zero when a delivery is lost or the retry/backoff/reuse expectations are not met.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import argparse
+import tempfile
+import threading
+import socketserver
+
+from flask import Flask, request, jsonify
+from werkzeug.serving import make_server
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class SmtpSink:
+    """Minimal SMTP server that accepts every message (no TLS, no AUTH) and counts sessions"""
+    def __init__(self):
+        self.messages = []; self.connections = 0; self.lock = threading.Lock(); self.server = None
+
+    def start(self, host='127.0.0.1'):
+        sink = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def reply(self, line):
+                self.wfile.write(line.encode('ascii') + b'\r\n')
+
+            def handle(self):
+                with sink.lock: sink.connections += 1
+                self.reply('220 sink ESMTP')
+                for raw in self.rfile:
+                    command = raw.decode('utf-8', 'replace').strip().upper()
+                    if command.startswith('EHLO'): self.wfile.write(b'250-sink\r\n250 8BITMIME\r\n')
+                    elif command == 'DATA':
+                        self.reply('354 End data with <CR><LF>.<CR><LF>'); lines = []
+                        for line in self.rfile:
+                            if line in (b'.\r\n', b'.\n'): break
+                            lines.append(line)
+                        with sink.lock: sink.messages.append(b''.join(lines))
+                        self.reply('250 Queued')
+                    elif command == 'QUIT': self.reply('221 Bye'); return
+                    else: self.reply('250 OK')
+
+        self.server = socketserver.ThreadingTCPServer((host, 0), Handler); self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self.server.server_address[1]
+
+    def stop(self):
+        if self.server: self.server.shutdown(); self.server.server_close(); self.server = None
+
+
+class FakeDrive:
+    """Speaks the resumable-upload half of the Drive v3 API; the first `failures` upload sessions get a 503"""
+    def __init__(self, failures=1):
+        self.failures = failures; self.attempts = []; self.files = {}; self.lock = threading.Lock()
+        self.app = self._create_app(); self.server = None
+
+    def _create_app(self):
+        app = Flask('fake_drive')
+
+        @app.route('/upload/drive/v3/files', methods=['POST'])
+        def start_upload():
+            with self.lock:
+                self.attempts.append(time.time())
+                if len(self.attempts) <= self.failures: return jsonify(error={'code': 503, 'message': 'injected failure'}), 503
+                session = f"s{len(self.attempts)}"; self.files[session] = {'metadata': request.get_json(silent=True) or {}}
+            response = jsonify({}); response.headers['Location'] = f"{request.host_url}upload-session/{session}"
+            return response
+
+        @app.route('/upload-session/<session>', methods=['PUT'])
+        def finish_upload(session):
+            with self.lock: self.files[session]['bytes'] = len(request.get_data())
+            return jsonify(id=f"file-{session}", name=self.files[session]['metadata'].get('name'))
+
+        return app
+
+    def start(self, host='127.0.0.1'):
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server(host, 0, self.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_port}/"
+
+    def stop(self):
+        if self.server: self.server.shutdown(); self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--emails', type=int, default=3)
+    parser.add_argument('--drive-failures', type=int, default=1)
+    parser.add_argument('--base-delay', type=float, default=0.5)
+    parser.add_argument('--timeout', type=float, default=60)
+    args = parser.parse_args()
+
+    os.environ.update({'SMTP_SERVER': '127.0.0.1', 'SMTP_STARTTLS': '0', 'EMAIL_SENDER': 'harness@example.com',
+                       'EMAIL_PASSWORD': 'unused', 'GDRIVE_SA_KEY_BASE64': 'harness', 'GOOGLE_DRIVE_FOLDER_ID': 'harness-folder',
+                       'DELIVERY_BASE_DELAY': str(args.base_delay)})
+    # server monkey-patches on import, so it has to come before any socket or thread the harness opens.
+    import server
+    from delivery import DeliveryQueue
+    from google.auth.credentials import AnonymousCredentials
+    from googleapiclient.discovery import build
+
+    sink = SmtpSink(); drive = FakeDrive(args.drive_failures)
+    os.environ['SMTP_PORT'] = str(sink.start()); drive_url = drive.start()
+    outbox = tempfile.mkdtemp(prefix='quantum-outbox-')
+    # The real GoogleDriveService upload path, pointed at the fake endpoint with offline discovery and no credentials.
+    drive_service = object.__new__(server.GoogleDriveService)
+    drive_service.creds = AnonymousCredentials(); drive_service.folder_id = 'harness-folder'
+    drive_service.service = build('drive', 'v3', credentials=drive_service.creds, client_options={'api_endpoint': drive_url},
+                                  static_discovery=True)
+    server.services['drive'] = drive_service
+
+    updates = []; idle = threading.Event()
+    queue = DeliveryQueue({'email': server.deliver_email, 'drive': server.deliver_drive}, directory=outbox,
+                          on_update=lambda item, state: updates.append((item['kind'], state, item['attempts'])),
+                          on_idle=lambda: (server.close_email_service(), idle.set()))
+    report = b'Name,Status\n' + b''.join(f"Patient {i:06d},Done\n".encode() for i in range(2000))
+    queue.enqueue('drive', {'filename': 'harness_Full.csv'}, {'harness_Full.csv': report})
+    for i in range(args.emails):
+        queue.enqueue('email', {'recipients': ['ops@example.com'], 'subject': f"Harness report {i}", 'body': '<p>harness</p>'},
+                      {'harness_Full.csv': report})
+    started = time.time()
+    while time.time() - started < args.timeout and any(name.endswith('.json') for name in os.listdir(outbox)):
+        time.sleep(0.1)
+    # The idle hook is what closes the shared SMTP session; wait for one pass after the outbox drained.
+    idle.clear(); queue.wake.set(); idle.wait(5)
+
+    gaps = [later - earlier for earlier, later in zip(drive.attempts, drive.attempts[1:])]
+    result = {'seconds': round(time.time() - started, 2), 'emails_received': len(sink.messages), 'smtp_connections': sink.connections,
+              'drive_attempts': len(drive.attempts), 'drive_files': sum(1 for f in drive.files.values() if 'bytes' in f),
+              'drive_retry_gaps_s': [round(gap, 2) for gap in gaps], 'updates': updates,
+              'failed': os.listdir(os.path.join(outbox, 'failed'))}
+    print(json.dumps(result, indent=2))
+    checks = {
+        'every email delivered': len(sink.messages) == args.emails,
+        'emails shared one SMTP session': sink.connections == 1,
+        'drive upload retried then delivered': len(drive.attempts) == args.drive_failures + 1 and result['drive_files'] == 1,
+        'backoff waited before each retry': all(gap >= args.base_delay * 0.8 for gap in gaps),
+        'outbox empty, nothing failed': not result['failed'] and not any(n.endswith('.json') for n in os.listdir(outbox)),
+    }
+    for name, ok in checks.items(): print(f"{'PASS' if ok else 'FAIL'}  {name}")
+    sink.stop(); drive.stop()
+    sys.exit(0 if all(checks.values()) else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+# benchmarks/mock_gateway.py
+"""Local stand-in for the Quantum ePay gateway that reproduces the DOM and backend calls QuantumBot relies on.
+
+Usage: python benchmarks/mock_gateway.py --rows 500 --latency-ms 150 --bad-rate 0.05 --failure-rate 0.01
+Any username/password and any 6-digit OTP are accepted.
+"""
+import json
+import time
+import logging
+import random
+import secrets
+import argparse
+import threading
+
+from flask import Flask, Response, request, redirect, jsonify
+from werkzeug.serving import make_server
+
+FIRST_NAMES = ['Ava', 'Liam', 'Mia', 'Noah', 'Zoe', 'Ethan', 'Isla', 'Lucas', 'Aria', 'Mason', 'Nora', 'Leo']
+LAST_NAMES = ['Smith', 'Garcia', 'Patel', 'Nguyen', 'Kim', 'Brown', 'Lopez', 'Singh', 'Cohen', 'Rossi', 'Silva', 'Khan']
+
+
+def synthetic_name(index):
+    # The zero-padded suffix keeps every name from being a substring of another one.
+    return f"{FIRST_NAMES[index % len(FIRST_NAMES)]} {LAST_NAMES[(index // len(FIRST_NAMES)) % len(LAST_NAMES)]} {index:06d}"
+
+
+BASE_HTML = """<!DOCTYPE html><html><head><title>Mock Quantum ePay</title><style>
+body{font-family:sans-serif;margin:20px}.dropdown-menu{list-style:none;padding:4px;border:1px solid #ccc;position:absolute;background:#fff}
+.modal{position:fixed;top:20%;left:30%;background:#fff;border:1px solid #333;padding:16px}.alert{color:#b00}
+</style></head><body>%NAV%<div id="app">%BODY%</div><div id="modal-root"></div><script>
+const auth = () => ({'Authorization': 'Bearer ' + (localStorage.getItem('access_token') || '')});
+const esc = s => String(s).replace(/[&<>"]/g, c => ({'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}[c]));
+function modal(html) { document.getElementById('modal-root').innerHTML = html ? '<div class="modal">' + html + '</div>' : ''; }
+%SCRIPT%</script></body></html>"""
+NAV_HTML = '<nav><a href="/dashboard"><span>Dashboard</span></a> | <a href="/credit-card/void"><span>Payments</span></a></nav>'
+
+LOGIN_BODY = """<form onsubmit="return false"><input id="Username" placeholder="Username"><input id="Password" type="password">
+<button id="login" type="button">Login</button></form><div class="alert" id="error"></div>"""
+LOGIN_SCRIPT = """
+document.getElementById('login').addEventListener('click', async () => {
+  const body = JSON.stringify({username: Username.value, password: Password.value});
+  const r = await fetch('/api/login', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: body});
+  if (!r.ok) { document.getElementById('error').textContent = 'Login failed'; return; }
+  document.getElementById('app').innerHTML = [1, 2, 3, 4, 5, 6].map(i => '<input id="code' + i + '" maxlength="1" size="1">').join('')
+    + '<button id="login" type="button">Verify</button><div class="alert" id="error"></div>';
+  document.getElementById('login').addEventListener('click', async () => {
+    const otp = [1, 2, 3, 4, 5, 6].map(i => document.getElementById('code' + i).value).join('');
+    const v = await fetch('/api/otp', {method: 'POST', headers: {'Content-Type': 'application/json'}, body: JSON.stringify({otp: otp})});
+    if (!v.ok) { document.getElementById('error').textContent = 'Invalid code'; return; }
+    localStorage.setItem('access_token', (await v.json()).token);
+    location.href = '/dashboard';
+  });
+});"""
+
+VOID_BODY = """<div class="table-wrapper"><input id="search" placeholder="Search">
+<table aria-busy="true"><thead><tr><th>Name</th><th>Amount</th><th></th></tr></thead><tbody></tbody></table>
+<ul class="pagination" id="pager"></ul></div>"""
+VOID_SCRIPT = """
+let page = 1, search = '', timer = null;
+const table = document.querySelector('.table-wrapper table'), tbody = table.querySelector('tbody'), pager = document.getElementById('pager');
+const row = r => '<tr data-id="' + r.id + '"><td>' + esc(r.name) + '</td><td>$' + r.amount + '</td><td>'
+  + '<button type="button" data-v-b6b33fa0>&#8942;</button><ul class="dropdown-menu" style="display:none">'
+  + '<li><a href="/transactions/' + r.id + '">Transaction Detail</a></li></ul></td></tr>';
+async function load() {
+  table.setAttribute('aria-busy', 'true');
+  const r = await fetch('/api/credit-card/void?search=' + encodeURIComponent(search) + '&page=' + page, {headers: auth()});
+  const data = r.ok ? await r.json() : {data: [], pages: 1};
+  tbody.innerHTML = data.data.length ? data.data.map(row).join('')
+    : '<tr class="b-table-empty-row"><td colspan="3">There are no records to show</td></tr>';
+  const last = page >= data.pages;
+  pager.innerHTML = '<li class="page-item' + (last ? ' disabled' : '') + '">'
+    + (last ? '<span>&rsaquo;</span>' : '<button type="button" aria-label="Go to next page">&rsaquo;</button>') + '</li>';
+  table.setAttribute('aria-busy', 'false');
+}
+tbody.addEventListener('click', e => {
+  const button = e.target.closest('button[data-v-b6b33fa0]');
+  if (button) { const menu = button.nextElementSibling; menu.style.display = menu.style.display === 'none' ? 'block' : 'none'; }
+});
+pager.addEventListener('click', e => { if (e.target.closest('button')) { page += 1; load(); } });
+document.getElementById('search').addEventListener('input', e => {
+  clearTimeout(timer); timer = setTimeout(() => { search = e.target.value; page = 1; load(); }, 150);
+});
+load();"""
+
+DETAIL_BODY = """<h3>Transaction %ID%</h3><div id="content"><button type="button" id="add-vault"><span>Add to Vault</span></button></div>"""
+DETAIL_SCRIPT = """
+const TXN = %ID%;
+const content = document.getElementById('content');
+document.getElementById('add-vault').addEventListener('click', () => {
+  modal('<p>Add this card to the vault?</p><div class="modal-footer"><button type="button" id="vault-cancel"><span>Cancel</span></button>'
+    + '<button type="button" id="vault-confirm"><span>Confirm</span></button></div>');
+  document.getElementById('vault-cancel').addEventListener('click', () => modal(''));
+  document.getElementById('vault-confirm').addEventListener('click', async () => {
+    const r = await fetch('/api/transactions/' + TXN + '/vault', {method: 'POST', headers: auth()});
+    if (r.status === 409) {
+      document.querySelector('.modal p').outerHTML = '<p class="alert">This transaction cannot be vaulted.</p>';
+      document.getElementById('vault-confirm').remove(); return;
+    }
+    modal('');
+    if (!r.ok) { content.innerHTML = '<p class="alert">Server error</p>'; return; }
+    const vault = (await r.json()).vault_id;
+    content.innerHTML = '<input name="company_name" value=""><button type="button" id="save"><span>Save Changes</span></button>';
+    document.getElementById('save').addEventListener('click', () => {
+      modal('<p>Save changes?</p><div class="modal-footer"><button type="button" id="save-cancel"><span>Cancel</span></button>'
+        + '<button type="button" id="save-confirm"><span>Confirm</span></button></div>');
+      document.getElementById('save-cancel').addEventListener('click', () => modal(''));
+      document.getElementById('save-confirm').addEventListener('click', async () => {
+        const name = document.querySelector('input[name=company_name]').value;
+        await fetch('/api/vault/' + vault, {method: 'PUT', headers: Object.assign({'Content-Type': 'application/json'}, auth()),
+          body: JSON.stringify({company_name: name})});
+        modal(''); content.innerHTML = '<p>Saved.</p>';
+      });
+    });
+  });
+});"""
+
+
+class MockGateway:
+    def __init__(self, rows=100, latency_ms=0, jitter_ms=0, failure_rate=0.0, bad_rate=0.0, per_page=50, seed=7):
+        self.latency_ms = latency_ms; self.jitter_ms = jitter_ms; self.failure_rate = failure_rate
+        self.per_page = per_page; self.random = random.Random(seed)
+        self.rows = [{'id': 1000 + i, 'name': synthetic_name(i), 'amount': f"{10 + (i * 7) % 490}.00",
+                      'bad': self.random.random() < bad_rate} for i in range(rows)]
+        self.by_id = {row['id']: row for row in self.rows}
+        self.tokens = set(); self.vaults = {}; self.lock = threading.Lock()
+        self.counters = {'requests': 0, 'vaulted': 0, 'bad': 0, 'saved': 0, 'failures': 0}
+        self.app = self._create_app(); self.server = None
+
+    def reset(self):
+        with self.lock:
+            self.vaults.clear(); self.counters = dict.fromkeys(self.counters, 0)
+
+    def _delay(self):
+        delay = self.latency_ms + (self.random.uniform(-self.jitter_ms, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0: time.sleep(delay / 1000)
+
+    def _fail(self):
+        if self.failure_rate and self.random.random() < self.failure_rate:
+            with self.lock: self.counters['failures'] += 1
+            return True
+        return False
+
+    def _authorized(self):
+        token = request.cookies.get('mock_session') or request.headers.get('Authorization', '')[7:]
+        return token in self.tokens
+
+    def _page(self, body, script, nav=True):
+        html = BASE_HTML.replace('%NAV%', NAV_HTML if nav else '').replace('%BODY%', body).replace('%SCRIPT%', script)
+        return Response(html, mimetype='text/html')
+
+    def _create_app(self):
+        app = Flask('mock_gateway')
+
+        @app.before_request
+        def before():
+            with self.lock: self.counters['requests'] += 1
+            self._delay()
+
+        @app.route('/')
+        def login_page():
+            return self._page(LOGIN_BODY, LOGIN_SCRIPT, nav=False)
+
+        @app.route('/api/login', methods=['POST'])
+        def api_login():
+            data = request.get_json(silent=True) or {}
+            return jsonify(ok=True) if data.get('username') and data.get('password') else (jsonify(ok=False), 401)
+
+        @app.route('/api/otp', methods=['POST'])
+        def api_otp():
+            otp = (request.get_json(silent=True) or {}).get('otp', '')
+            if len(otp) != 6 or not otp.isdigit(): return jsonify(ok=False), 401
+            token = secrets.token_hex(16)
+            with self.lock: self.tokens.add(token)
+            response = jsonify(token=token); response.set_cookie('mock_session', token)
+            return response
+
+        @app.route('/dashboard')
+        def dashboard():
+            if not self._authorized(): return redirect('/')
+            return self._page('<h2>Dashboard</h2>', '')
+
+        @app.route('/credit-card/void')
+        def void_page():
+            if not self._authorized(): return redirect('/')
+            return self._page(VOID_BODY, VOID_SCRIPT)
+
+        @app.route('/transactions/<int:transaction_id>')
+        def detail_page(transaction_id):
+            if not self._authorized(): return redirect('/')
+            if transaction_id not in self.by_id: return Response('Not found', status=404)
+            return self._page(DETAIL_BODY.replace('%ID%', str(transaction_id)), DETAIL_SCRIPT.replace('%ID%', str(transaction_id)))
+
+        @app.route('/api/credit-card/void')
+        def api_void():
+            if not self._authorized(): return jsonify(error='unauthorized'), 401
+            if self._fail(): return jsonify(error='injected failure'), 500
+            search = request.args.get('search', '').strip().lower()
+            rows = [r for r in self.rows if search in r['name'].lower()] if search else self.rows
+            page = max(1, request.args.get('page', 1, type=int)); pages = max(1, -(-len(rows) // self.per_page))
+            chunk = rows[(page - 1) * self.per_page: page * self.per_page]
+            return jsonify(data=[{'id': r['id'], 'name': r['name'], 'amount': r['amount']} for r in chunk], page=page, pages=pages)
+
+        @app.route('/api/transactions/<int:transaction_id>/vault', methods=['POST'])
+        def api_vault(transaction_id):
+            if not self._authorized(): return jsonify(error='unauthorized'), 401
+            row = self.by_id.get(transaction_id)
+            if not row: return jsonify(error='not found'), 404
+            if self._fail(): return jsonify(error='injected failure'), 500
+            with self.lock:
+                if row['bad']: self.counters['bad'] += 1; return jsonify(error='bad state'), 409
+                vault_id = len(self.vaults) + 1; self.vaults[vault_id] = {'transaction_id': transaction_id}
+                self.counters['vaulted'] += 1
+            return jsonify(vault_id=vault_id)
+
+        @app.route('/api/vault/<int:vault_id>', methods=['PUT'])
+        def api_vault_update(vault_id):
+            if not self._authorized(): return jsonify(error='unauthorized'), 401
+            with self.lock:
+                if vault_id not in self.vaults: return jsonify(error='not found'), 404
+                self.vaults[vault_id]['company_name'] = (request.get_json(silent=True) or {}).get('company_name')
+                self.counters['saved'] += 1
+            return jsonify(ok=True)
+
+        return app
+
+    def start(self, host='127.0.0.1', port=0):
+        """Serve on a background thread and return the base URL"""
+        logging.getLogger('werkzeug').setLevel(logging.WARNING)
+        self.server = make_server(host, port, self.app, threaded=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return f"http://{host}:{self.server.server_port}"
+
+    def stop(self):
+        if self.server: self.server.shutdown(); self.server = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--port', type=int, default=8700)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--per-page', type=int, default=50)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--bad-rate', type=float, default=0.0)
+    args = parser.parse_args()
+    gateway = MockGateway(rows=args.rows, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate,
+                          bad_rate=args.bad_rate, per_page=args.per_page)
+    print(f"Mock gateway with {args.rows} rows on http://127.0.0.1:{args.port} (set QUANTUM_GATEWAY_URL to use it)")
+    print(json.dumps({'first_rows': [r['name'] for r in gateway.rows[:3]]}))
+    gateway.app.run(host='127.0.0.1', port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+# benchmarks/socketio_latency.py
+"""Measure Socket.IO round-trip latency against a running server.py, e.g. while an automation run is active.
+
+Requires the Socket.IO client: pip install "python-socketio[client]"
+Usage: python benchmarks/socketio_latency.py --url http://localhost:7860 --duration 60
+"""
+import time
+import argparse
+import statistics
+
+import socketio
+
+
+def percentile(values, pct):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--url', default='http://localhost:7860')
+    parser.add_argument('--duration', type=float, default=30, help='seconds to sample for')
+    parser.add_argument('--interval', type=float, default=0.1, help='seconds between probes')
+    args = parser.parse_args()
+
+    client = socketio.Client()
+    client.connect(args.url, transports=['websocket'])
+    samples = []; timeouts = 0; deadline = time.time() + args.duration
+    while time.time() < deadline:
+        started = time.perf_counter()
+        try:
+            client.call('latency_probe', {}, timeout=5)
+            samples.append((time.perf_counter() - started) * 1000)
+        except socketio.exceptions.TimeoutError:
+            timeouts += 1
+        time.sleep(args.interval)
+    client.disconnect()
+
+    if not samples:
+        print(f"No probes answered ({timeouts} timed out)."); return
+    print(f"probes={len(samples)} timeouts={timeouts}")
+    print(f"latency ms: p50={percentile(samples, 50):.1f} p95={percentile(samples, 95):.1f} "
+          f"p99={percentile(samples, 99):.1f} max={max(samples):.1f} mean={statistics.mean(samples):.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# benchmarks/throughput.py
+"""End-to-end throughput benchmark: runs QuantumBot.process_patient_list against the local mock gateway.
+
+Needs Chromium + chromedriver (CHROME_BINARY / CHROMEDRIVER_PATH if not in /usr/bin).
+Usage: python benchmarks/throughput.py --sizes 10,100,1000 --workers 2 --engines selenium,http --latency-ms 100
+"""
+import os
+import sys
+import csv
+import json
+import time
+import argparse
+import tempfile
+import threading
+from collections import Counter
+from contextlib import nullcontext
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from mock_gateway import MockGateway, synthetic_name
+from metrics import process_tree_rss_bytes
+
+
+class NullEmitter:
+    """Discards bot events; stands in for socketio and the Flask app"""
+    def emit(self, event, data=None, **kwargs):
+        pass
+
+    def app_context(self):
+        return nullcontext()
+
+
+def process_tree_rss_mb(root_pid=None):
+    return process_tree_rss_bytes(root_pid) / (1024 * 1024)
+
+
+class MemorySampler:
+    def __init__(self, interval=0.5):
+        self.interval = interval; self.peak = 0.0; self.stopped = threading.Event()
+
+    def __enter__(self):
+        threading.Thread(target=self._run, daemon=True).start(); return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.peak = max(self.peak, process_tree_rss_mb())
+
+    def __exit__(self, *exc):
+        self.stopped.set(); self.peak = max(self.peak, process_tree_rss_mb())
+
+
+def write_csv(size, missing_rate, directory):
+    """Synthetic patient CSV: names present in the mock gateway plus a share that have no transaction"""
+    path = os.path.join(directory, f"patients_{size}.csv"); missing = int(size * missing_rate)
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f); writer.writerow(['Name', 'Status', 'Notes'])
+        for i in range(size - missing): writer.writerow([synthetic_name(i), '', 'benchmark'])
+        for i in range(missing): writer.writerow([f"Missing Patient {i:06d}", '', 'benchmark'])
+    return path
+
+
+def run_once(gateway, size, engine, args, directory):
+    from worker import QuantumBot, StepTimings
+    gateway.reset()
+    with open(write_csv(size, args.missing_rate, directory), newline='') as f:
+        patient_list = [row['Name'] for row in csv.DictReader(f)]
+    emitter = NullEmitter()
+    bot = QuantumBot(emitter, emitter, num_workers=args.workers, engine=engine, profile=args.profile)
+    bot.timings = StepTimings(window=None)
+    try:
+        for step, call in (('initialize_driver', bot.initialize_driver), ('login', lambda: bot.login('bench', 'bench')),
+                           ('submit_otp', lambda: bot.submit_otp('123456'))):
+            is_success, error_message = call()
+            if not is_success: raise RuntimeError(f"{step}: {error_message}")
+        with MemorySampler() as memory:
+            started = time.time()
+            results = bot.process_patient_list(patient_list)
+            elapsed = time.time() - started
+    finally:
+        bot.shutdown()
+    return {
+        'rows': size, 'workers': args.workers, 'engine': engine, 'profile': args.profile,
+        'seconds': round(elapsed, 1), 'patients_per_minute': round(len(results) / max(elapsed, 1e-6) * 60, 1),
+        'outcomes': dict(Counter(r['Status'] for r in results)), 'peak_rss_mb': round(memory.peak, 1),
+        'steps': bot.timings.summary(), 'navigation': bot.navigation_summary(), 'gateway': dict(gateway.counters),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='10,100', help='comma-separated CSV sizes, 10 to 10000')
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--engines', default='selenium', help='comma-separated: selenium,http runs both side by side')
+    parser.add_argument('--profile', default='lean')
+    parser.add_argument('--latency-ms', type=float, default=50)
+    parser.add_argument('--jitter-ms', type=float, default=0)
+    parser.add_argument('--failure-rate', type=float, default=0.0)
+    parser.add_argument('--bad-rate', type=float, default=0.05)
+    parser.add_argument('--missing-rate', type=float, default=0.05)
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+
+    gateway = MockGateway(rows=max(sizes), latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                          failure_rate=args.failure_rate, bad_rate=args.bad_rate)
+    os.environ['QUANTUM_GATEWAY_URL'] = gateway.start()
+    reports = []
+    with tempfile.TemporaryDirectory(prefix='quantum-bench-') as directory:
+        for size, engine in ((size, engine) for size in sizes for engine in args.engines.split(',')):
+            report = run_once(gateway, size, engine.strip(), args, directory); reports.append(report)
+            print(f"rows={report['rows']} workers={report['workers']} engine={report['engine']} profile={report['profile']} "
+                  f"time={report['seconds']}s rate={report['patients_per_minute']} patients/min "
+                  f"peak_rss={report['peak_rss_mb']}MB outcomes={report['outcomes']}")
+            for step, timing in sorted(report['steps'].items()):
+                print(f"    {step:<20} n={timing['count']:<4} p50={timing['p50']:.3f}s p95={timing['p95']:.3f}s")
+    gateway.stop()
+    if args.json:
+        with open(args.json, 'w') as f: json.dump(reports, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
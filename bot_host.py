@@ -0,0 +1,204 @@
+# bot_host.py
+import os
+import sys
+import json
+import itertools
+import threading
+import subprocess
+from contextlib import nullcontext
+
+
+class Channel:
+    """Newline-delimited JSON messages over a pipe, safe to send from several threads"""
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def send(self, message):
+        line = json.dumps(message) + '\n'
+        with self.lock:
+            self.stream.write(line); self.stream.flush()
+
+
+class ChannelEmitter:
+    """Stands in for socketio/app inside the worker process and forwards emits to server.py"""
+    def __init__(self, channel, bot_id):
+        self.channel = channel
+        self.bot_id = bot_id
+
+    def emit(self, event, data=None, **kwargs):
+        self.channel.send({'bot': self.bot_id, 'event': event, 'data': data})
+
+    def app_context(self):
+        return nullcontext()
+
+
+class BotHost:
+    """Worker-process side: owns the QuantumBot instances and runs each command on a real thread"""
+    def __init__(self, channel):
+        from worker import DriverPool
+        self.channel = channel
+        self.bots = {}
+        self.driver_pool = DriverPool().start()
+
+    def serve(self, stream):
+        for line in stream:
+            try: message = json.loads(line)
+            except ValueError: continue
+            if message.get('cmd') == 'stop': self._run(message)
+            else: threading.Thread(target=self._run, args=(message,), daemon=True).start()
+        for bot_id in list(self.bots): self.cmd_shutdown(bot_id)
+        self.driver_pool.close()
+
+    def _run(self, message):
+        try:
+            handler = getattr(self, f"cmd_{message['cmd']}")
+            result = handler(message.get('bot'), *message.get('args', []), **message.get('kwargs', {}))
+            self.channel.send({'reply': message['id'], 'result': result})
+        except Exception as e:
+            print(f"[BotHost] Command '{message.get('cmd')}' failed: {e}")
+            self.channel.send({'reply': message['id'], 'error': str(e)})
+
+    def cmd_create(self, bot_id, **kwargs):
+        from worker import QuantumBot
+        if bot_id in self.bots: self.cmd_shutdown(bot_id)
+        emitter = ChannelEmitter(self.channel, bot_id)
+        self.bots[bot_id] = QuantumBot(emitter, emitter, driver_pool=self.driver_pool, **kwargs)
+        return True
+
+    def cmd_initialize_driver(self, bot_id):
+        return list(self.bots[bot_id].initialize_driver())
+
+    def cmd_login(self, bot_id, username, password):
+        return list(self.bots[bot_id].login(username, password))
+
+    def cmd_submit_otp(self, bot_id, otp):
+        return list(self.bots[bot_id].submit_otp(otp))
+
+    def cmd_process_patient_list(self, bot_id, patient_list):
+        bot = self.bots[bot_id]
+        on_result = lambda name, status: self.channel.send({'bot': bot_id, 'result': [name, status]})
+        results = bot.process_patient_list(patient_list, on_result=on_result)
+        return {'results': results, 'terminated': bot.termination_event.is_set()}
+
+    def cmd_stop(self, bot_id):
+        if bot_id in self.bots: self.bots[bot_id].stop()
+        return True
+
+    def cmd_metrics(self, bot_id=None):
+        from metrics import REGISTRY
+        return REGISTRY.render()
+
+    def cmd_shutdown(self, bot_id):
+        bot = self.bots.pop(bot_id, None)
+        if bot: bot.shutdown()
+        return True
+
+
+class BotHostClient:
+    """server.py side: starts the worker process, sends commands and dispatches its events"""
+    def __init__(self, on_event, start_task=None):
+        self.on_event = on_event
+        self.start_task = start_task or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.proc = None; self.pending = {}; self.result_handlers = {}
+        self.ids = itertools.count(1); self.lock = threading.Lock()
+
+    def start(self):
+        with self.lock:
+            if self.proc and self.proc.poll() is None: return
+            script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot_host.py')
+            self.proc = subprocess.Popen([sys.executable, script], stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                         text=True, bufsize=1)
+            print(f"[BotHost] Worker process started (pid {self.proc.pid}).")
+            self.start_task(lambda proc=self.proc: self._read_loop(proc))
+
+    def _read_loop(self, proc):
+        for line in proc.stdout:
+            try: message = json.loads(line)
+            except ValueError: continue
+            if 'reply' in message:
+                waiter = self.pending.pop(message['reply'], None)
+                if waiter: waiter['message'] = message; waiter['done'].set()
+                continue
+            # A failing handler (journal fsync, emit) must not end the loop, or every pending call() hangs.
+            try:
+                if 'result' in message:
+                    handler = self.result_handlers.get(message.get('bot'))
+                    if handler: handler(*message['result'])
+                else:
+                    self.on_event(message.get('bot'), message.get('event'), message.get('data'))
+            except Exception as e:
+                print(f"[BotHost] Error handling message from bot {message.get('bot')}: {e}")
+        print(f"[BotHost] Worker process exited (code {proc.wait()}).")
+        for request_id in list(self.pending):
+            waiter = self.pending.pop(request_id, None)
+            if waiter: waiter['message'] = {'error': 'Bot worker process exited.'}; waiter['done'].set()
+
+    def send(self, bot_id, cmd, *args, **kwargs):
+        self.start()
+        request_id = next(self.ids)
+        waiter = {'done': threading.Event(), 'message': None}
+        self.pending[request_id] = waiter
+        with self.lock:
+            self.proc.stdin.write(json.dumps({'id': request_id, 'bot': bot_id, 'cmd': cmd, 'args': list(args), 'kwargs': kwargs}) + '\n')
+            self.proc.stdin.flush()
+        return waiter
+
+    def call(self, bot_id, cmd, *args, timeout=None, **kwargs):
+        waiter = self.send(bot_id, cmd, *args, **kwargs)
+        if not waiter['done'].wait(timeout): raise TimeoutError(f"Bot command '{cmd}' timed out.")
+        if 'error' in waiter['message']: raise RuntimeError(waiter['message']['error'])
+        return waiter['message']['result']
+
+
+class RemoteBot:
+    """Proxy with the QuantumBot interface server.py uses, backed by the worker process"""
+    def __init__(self, client, bot_id, **kwargs):
+        self.client = client
+        self.bot_id = bot_id
+        self.termination_event = threading.Event()
+        self.options = kwargs
+
+    def _result_call(self, cmd, *args):
+        try: return tuple(self.client.call(self.bot_id, cmd, *args))
+        except Exception as e: return False, f"Message: {str(e)}"
+
+    def initialize_driver(self):
+        try: self.client.call(self.bot_id, 'create', timeout=60, **self.options)
+        except Exception as e: return False, f"Message: {str(e)}"
+        return self._result_call('initialize_driver')
+
+    def login(self, username, password):
+        return self._result_call('login', username, password)
+
+    def submit_otp(self, otp):
+        return self._result_call('submit_otp', otp)
+
+    def process_patient_list(self, patient_list, on_result=None):
+        self.client.result_handlers[self.bot_id] = on_result
+        try:
+            reply = self.client.call(self.bot_id, 'process_patient_list', patient_list)
+        finally:
+            self.client.result_handlers.pop(self.bot_id, None)
+        if reply['terminated']: self.termination_event.set()
+        return reply['results']
+
+    def stop(self):
+        self.termination_event.set()
+        self.client.send(self.bot_id, 'stop')
+
+    def shutdown(self):
+        try: self.client.call(self.bot_id, 'shutdown', timeout=60)
+        except Exception as e: print(f"[BotHost] Error during shutdown: {e}")
+
+
+def main():
+    # Keep the channel on the original stdout and send the bot's prints to stderr (the service log).
+    channel = Channel(os.fdopen(os.dup(sys.stdout.fileno()), 'w', buffering=1))
+    os.dup2(sys.stderr.fileno(), sys.stdout.fileno())
+    sys.stdout = sys.stderr
+    BotHost(channel).serve(sys.stdin)
+
+
+if __name__ == '__main__':
+    main()
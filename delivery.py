@@ -0,0 +1,107 @@
+# delivery.py
+import os
+import json
+import time
+import uuid
+import random
+import shutil
+import threading
+
+
+class DeliveryQueue:
+    """Persistent outbox for report emails and Drive uploads, retried with exponential backoff"""
+    def __init__(self, handlers, directory=None, start_task=None, on_update=None, on_idle=None):
+        self.handlers = handlers
+        self.directory = directory or os.getenv('DELIVERY_DIR', 'outbox')
+        self.failed_directory = os.path.join(self.directory, 'failed')
+        os.makedirs(self.failed_directory, exist_ok=True)
+        self.max_attempts = int(os.getenv('DELIVERY_MAX_ATTEMPTS', 8))
+        self.base_delay = float(os.getenv('DELIVERY_BASE_DELAY', 15))
+        self.max_delay = float(os.getenv('DELIVERY_MAX_DELAY', 1800))
+        self.start_task = start_task or (lambda fn: threading.Thread(target=fn, daemon=True).start())
+        self.on_update = on_update or (lambda item, state: None)
+        self.on_idle = on_idle or (lambda: None)
+        self.wake = threading.Event(); self.started = False
+
+    def _item_path(self, item_id):
+        return os.path.join(self.directory, f"{item_id}.json")
+
+    def _save(self, item):
+        path = self._item_path(item['id']); tmp = path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(item, f); f.flush(); os.fsync(f.fileno())
+        os.replace(tmp, path)
+
+    def enqueue(self, kind, payload, attachments=None, room=None, files=None):
+        """Spool a delivery to disk; attachments maps filename -> str/bytes content, files maps filename -> path to copy"""
+        if not self.started: self.start()
+        item_id = uuid.uuid4().hex[:12]
+        spooled = {}
+        if attachments or files:
+            folder = os.path.join(self.directory, item_id); os.makedirs(folder, exist_ok=True)
+            for filename, content in (attachments or {}).items():
+                path = os.path.join(folder, os.path.basename(filename))
+                with open(path, 'wb') as f:
+                    f.write(content.encode('utf-8') if isinstance(content, str) else content)
+                spooled[filename] = path
+            for filename, source in (files or {}).items():
+                path = os.path.join(folder, os.path.basename(filename))
+                shutil.copyfile(source, path); spooled[filename] = path
+        item = {'id': item_id, 'kind': kind, 'payload': payload, 'attachments': spooled, 'room': room,
+                'attempts': 0, 'next_attempt': time.time(), 'last_error': None, 'created': time.time()}
+        self._save(item)
+        print(f"[Delivery] Queued {kind} {item_id}.")
+        self.wake.set()
+        return item_id
+
+    def start(self):
+        if self.started: return self
+        self.started = True
+        pending = len(self._load_all())
+        if pending: print(f"[Delivery] Resuming {pending} pending deliveries from {self.directory}.")
+        self.start_task(self._run)
+        return self
+
+    def _load_all(self):
+        items = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'): continue
+            try:
+                with open(os.path.join(self.directory, name), encoding='utf-8') as f: items.append(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"[Delivery] Skipping unreadable outbox entry {name}: {e}")
+        return sorted(items, key=lambda item: item['next_attempt'])
+
+    def _run(self):
+        while True:
+            try:
+                items = self._load_all(); now = time.time()
+                due = [item for item in items if item['next_attempt'] <= now]
+                for item in due: self._attempt(item)
+                if not items: self.on_idle()
+                if due: continue
+                wait = min((item['next_attempt'] for item in items), default=now + 60) - now
+            except Exception as e:
+                print(f"[Delivery] Outbox loop error: {e}"); wait = 5
+            self.wake.wait(max(0.5, min(wait, 60))); self.wake.clear()
+
+    def _attempt(self, item):
+        handler = self.handlers.get(item['kind'])
+        try:
+            ok = bool(handler and handler(item['payload'], item['attachments']))
+            error = None if ok else 'delivery handler reported failure'
+        except Exception as e:
+            ok = False; error = str(e)
+        if ok:
+            os.remove(self._item_path(item['id'])); shutil.rmtree(os.path.join(self.directory, item['id']), ignore_errors=True)
+            print(f"[Delivery] Delivered {item['kind']} {item['id']} after {item['attempts'] + 1} attempt(s).")
+            return self.on_update(item, 'delivered')
+        item['attempts'] += 1; item['last_error'] = error
+        if item['attempts'] >= self.max_attempts:
+            os.replace(self._item_path(item['id']), os.path.join(self.failed_directory, f"{item['id']}.json"))
+            print(f"[Delivery] Giving up on {item['kind']} {item['id']}: {error}")
+            return self.on_update(item, 'failed')
+        delay = min(self.max_delay, self.base_delay * 2 ** (item['attempts'] - 1)) * random.uniform(0.8, 1.2)
+        item['next_attempt'] = time.time() + delay; self._save(item)
+        print(f"[Delivery] {item['kind']} {item['id']} failed ({error}); retry {item['attempts']} in {delay:.0f}s.")
+        self.on_update(item, 'retrying')
@@ -0,0 +1,87 @@
+# http_engine.py
+import os
+import threading
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Backend routes used by the gateway's frontend. They are not published, so each can be
+# overridden per deployment. Search returns a list (or {'data': [...]}) of rows with 'id' and
+# 'name'; vault returns {'vault_id': ...} or 409/422 when the transaction is in a bad state.
+# benchmarks/mock_gateway.py serves the same contract for local testing.
+API_URL = os.getenv('QUANTUM_API_URL', '').rstrip('/')
+SEARCH_PATH = os.getenv('QUANTUM_API_SEARCH_PATH', '/api/credit-card/void?search={name}')
+VAULT_PATH = os.getenv('QUANTUM_API_VAULT_PATH', '/api/transactions/{transaction_id}/vault')
+CUSTOMER_PATH = os.getenv('QUANTUM_API_CUSTOMER_PATH', '/api/vault/{vault_id}')
+TOKEN_KEYS = ('access_token', 'token', 'auth._token.local', 'jwt', 'id_token')
+BAD_STATE_CODES = (409, 422)
+
+
+class GatewayHttpEngine:
+    def __init__(self, session_state, base_url, user_agent=None, pool_size=4, timeout=15):
+        self.base_url = API_URL or base_url.rstrip('/')
+        self.timeout = timeout
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, pool_size), max_retries=0)
+        self.http.mount('https://', adapter); self.http.mount('http://', adapter)
+        self.http.headers.update({'Accept': 'application/json', 'X-Requested-With': 'XMLHttpRequest'})
+        if user_agent: self.http.headers['User-Agent'] = user_agent
+        for cookie in session_state.get('cookies', []):
+            self.http.cookies.set(cookie['name'], cookie['value'], domain=cookie.get('domain'), path=cookie.get('path', '/'))
+        token = self._find_token(session_state)
+        if token: self.http.headers['Authorization'] = f"Bearer {token}"
+        self.lock = threading.Lock(); self.stats = {'http': 0, 'fallback': 0}
+
+    def _find_token(self, session_state):
+        for store in (session_state.get('local', {}), session_state.get('session', {})):
+            for key in TOKEN_KEYS:
+                value = store.get(key)
+                if value: return value[7:] if value.startswith('Bearer ') else value.strip('"')
+        return None
+
+    def _url(self, template, **params):
+        return self.base_url + template.format(**{k: quote(str(v), safe='') for k, v in params.items()})
+
+    def find_transaction(self, patient_name):
+        response = self.http.get(self._url(SEARCH_PATH, name=patient_name), timeout=self.timeout)
+        response.raise_for_status()
+        payload = response.json()
+        rows = payload.get('data', payload.get('items', [])) if isinstance(payload, dict) else payload
+        # The vault call is a write, so only an exact, unambiguous name match may drive it.
+        target = ' '.join(patient_name.split()).casefold()
+        matches = [row for row in rows or [] if ' '.join(str(row.get('name') or row.get('customer_name') or '').split()).casefold() == target]
+        return matches[0] if len(matches) == 1 else None
+
+    def process(self, patient_name):
+        """Returns 'Done'/'Bad'/'Error', or None when nothing was changed and the browser path should take over"""
+        try:
+            transaction = self.find_transaction(patient_name)
+        except Exception as e:
+            print(f"[HTTP] Lookup failed for '{patient_name}': {e}")
+            return self._fallback()
+        if not transaction or transaction.get('id') is None: return self._fallback()
+        try:
+            response = self.http.post(self._url(VAULT_PATH, transaction_id=transaction['id']), timeout=self.timeout)
+            if response.status_code in BAD_STATE_CODES: return self._count('Bad')
+            response.raise_for_status()
+            vault_id = (response.json() or {}).get('vault_id')
+            if vault_id is None: return self._count('Bad')
+            response = self.http.put(self._url(CUSTOMER_PATH, vault_id=vault_id), json={'company_name': patient_name}, timeout=self.timeout)
+            response.raise_for_status()
+            return self._count('Done')
+        except Exception as e:
+            # The vault call may already have gone through, so replaying it in the browser is unsafe.
+            print(f"[HTTP] Vault update failed for '{patient_name}': {e}")
+            return self._count('Error')
+
+    def _count(self, status):
+        with self.lock: self.stats['http'] += 1
+        return status
+
+    def _fallback(self):
+        with self.lock: self.stats['fallback'] += 1
+        return None
+
+    def close(self):
+        self.http.close()
@@ -0,0 +1,128 @@
+# jobs.py
+import os
+import time
+import uuid
+import threading
+from collections import deque, OrderedDict
+
+ACTIVE_STATES = ('initializing', 'ready', 'running')
+
+
+def available_memory_mb():
+    try:
+        with open('/proc/meminfo') as f:
+            for line in f:
+                if line.startswith('MemAvailable:'): return int(line.split()[1]) // 1024
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def browser_capacity():
+    """How many headless browsers this container can run at once, from MAX_BROWSERS or CPU/RAM"""
+    if os.getenv('MAX_BROWSERS'): return max(1, int(os.getenv('MAX_BROWSERS')))
+    by_cpu = int((os.cpu_count() or 1) * float(os.getenv('BROWSERS_PER_CPU', 1)))
+    memory = available_memory_mb()
+    by_memory = memory // int(os.getenv('MB_PER_BROWSER', 400)) if memory else by_cpu
+    return max(1, min(by_cpu, by_memory))
+
+
+class Job:
+    def __init__(self, operator, sid, data, capacity=None):
+        self.id = uuid.uuid4().hex[:12]
+        self.operator = operator; self.sid = sid
+        self.data = {'csv_path': data['csv_path'], 'emails': data['emails'], 'filename': data['filename']}
+        # The scheduler charges a job for its browsers, so the bot must never launch more than that.
+        self.browsers = max(1, min(int(data.get('workers') or os.getenv('BOT_WORKERS', 1)), capacity or browser_capacity()))
+        self.options = {'num_workers': self.browsers, 'engine': data.get('engine'), 'profile': data.get('profile')}
+        self.state = 'queued'; self.bot = None; self.message = None
+        self.created = time.time(); self.started = None; self.finished = None
+        self.total = 0; self.processed = 0; self.outcomes = {}
+
+    @property
+    def room(self):
+        return self.id
+
+    def record_result(self, status):
+        self.processed += 1; self.outcomes[status] = self.outcomes.get(status, 0) + 1
+
+    def throughput(self):
+        if not self.started or not self.processed: return 0.0
+        return round(self.processed / max((self.finished or time.time()) - self.started, 1e-6) * 60, 2)
+
+    def to_dict(self):
+        return {'id': self.id, 'operator': self.operator, 'state': self.state, 'filename': self.data.get('filename'),
+                'created': self.created, 'started': self.started, 'finished': self.finished, 'total': self.total,
+                'processed': self.processed, 'outcomes': self.outcomes, 'patients_per_minute': self.throughput(),
+                'message': self.message}
+
+
+class JobScheduler:
+    """Registry of jobs plus a browser-budgeted queue that round-robins between operators"""
+    def __init__(self, on_start, capacity=None, history=50):
+        self.on_start = on_start
+        self.capacity = capacity or browser_capacity()
+        self.jobs = OrderedDict(); self.queues = OrderedDict(); self.history = history
+        self.lock = threading.Lock()
+        print(f"[Jobs] Scheduler capacity: {self.capacity} browser(s).")
+
+    def in_use(self):
+        return sum(min(job.browsers, self.capacity) for job in self.jobs.values() if job.state in ACTIVE_STATES)
+
+    def submit(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            self.queues.setdefault(job.operator, deque()).append(job)
+        self.dispatch()
+        return job
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def position(self, job):
+        """1-based place in the dispatch order, or 0 once the job has left the queue"""
+        with self.lock:
+            order = self._fair_order()
+        return order.index(job) + 1 if job in order else 0
+
+    def _fair_order(self):
+        queues = {operator: list(queue) for operator, queue in self.queues.items() if queue}
+        running = {}
+        for job in self.jobs.values():
+            if job.state in ACTIVE_STATES: running[job.operator] = running.get(job.operator, 0) + 1
+        order = []
+        while queues:
+            # Operators with the fewest active jobs go first; ties keep round-robin order.
+            operator = min(queues, key=lambda op: running.get(op, 0))
+            order.append(queues[operator].pop(0)); running[operator] = running.get(operator, 0) + 1
+            if not queues[operator]: del queues[operator]
+        return order
+
+    def dispatch(self):
+        started = []
+        with self.lock:
+            for job in self._fair_order():
+                if self.in_use() + min(job.browsers, self.capacity) > self.capacity: break
+                self.queues[job.operator].remove(job)
+                self.queues.move_to_end(job.operator)
+                job.state = 'initializing'; job.started = time.time(); started.append(job)
+        for job in started: self.on_start(job)
+
+    def cancel(self, job):
+        with self.lock:
+            queue = self.queues.get(job.operator)
+            if queue and job in queue: queue.remove(job)
+        self.finish(job, 'cancelled')
+
+    def finish(self, job, state='finished', message=None):
+        job.state = state; job.finished = time.time(); job.message = message or job.message
+        with self.lock:
+            done = [j for j in self.jobs.values() if j.state not in ACTIVE_STATES + ('queued',)]
+            for old in done[:max(0, len(done) - self.history)]: del self.jobs[old.id]
+        self.dispatch()
+
+    def snapshot(self):
+        with self.lock:
+            order = self._fair_order(); jobs = list(self.jobs.values())
+        listing = [dict(job.to_dict(), position=order.index(job) + 1 if job in order else 0) for job in jobs]
+        return {'capacity': self.capacity, 'in_use': self.in_use(), 'jobs': listing}
@@ -0,0 +1,39 @@
+# journal.py
+import os
+import json
+import threading
+from datetime import datetime
+
+
+class CheckpointJournal:
+    """Append-only, fsync'd record of patient outcomes for one uploaded CSV, keyed by the file's content hash"""
+    def __init__(self, key, directory=None):
+        self.directory = directory or os.getenv('JOURNAL_DIR', 'journal')
+        os.makedirs(self.directory, exist_ok=True)
+        self.key = key
+        self.path = os.path.join(self.directory, f"{self.key}.jsonl")
+        self.lock = threading.Lock()
+        self.file = None
+
+    def replay(self):
+        """Return the latest status per CSV row (per name for older records); a torn final line from a crash is ignored"""
+        statuses = {}
+        if not os.path.exists(self.path): return statuses
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    statuses[record['row'] if record.get('row') is not None else record['name']] = record['status']
+                except (ValueError, KeyError):
+                    continue
+        return statuses
+
+    def append(self, name, status, row=None):
+        record = json.dumps({'name': name, 'status': status, 'row': row, 'ts': datetime.now().isoformat(timespec='seconds')})
+        with self.lock:
+            if self.file is None: self.file = open(self.path, 'a', encoding='utf-8')
+            self.file.write(record + '\n'); self.file.flush(); os.fsync(self.file.fileno())
+
+    def close(self):
+        with self.lock:
+            if self.file: self.file.close(); self.file = None
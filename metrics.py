@@ -0,0 +1,166 @@
+# metrics.py
+import os
+import time
+import threading
+from collections import deque
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+
+def _labels(names, values):
+    if not names: return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in values)
+    return '{' + ','.join(f'{n}="{v}"' for n, v in zip(names, escaped)) + '}'
+
+
+def _number(value):
+    if value == float('inf'): return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name; self.documentation = documentation; self.labelnames = tuple(labelnames)
+        self.values = {}; self.lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_labels(names, values)} {_number(value)}")
+        return '\n'.join(lines)
+
+    def samples(self):
+        with self.lock: items = sorted(self.values.items())
+        return [('', self.labelnames, key, value) for key, value in items]
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock: self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Set directly, or read from a callback at scrape time with set_function"""
+    kind = 'gauge'
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.function = None
+
+    def set(self, value, **labels):
+        with self.lock: self.values[self._key(labels)] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock: self.values[key] = self.values.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+    def set_function(self, function):
+        self.function = function
+        return self
+
+    def samples(self):
+        if not self.function: return super().samples()
+        try: value = self.function()
+        except Exception: return []
+        return [('', (), (), value)] if value is not None else []
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            series = self.values.setdefault(key, {'counts': [0] * len(self.buckets), 'sum': 0.0, 'count': 0})
+            for i, bound in enumerate(self.buckets):
+                if value <= bound: series['counts'][i] += 1
+            series['sum'] += value; series['count'] += 1
+
+    def samples(self):
+        with self.lock: items = sorted((key, dict(series, counts=list(series['counts']))) for key, series in self.values.items())
+        samples = []
+        for key, series in items:
+            for bound, count in zip(self.buckets, series['counts']):
+                samples.append(('_bucket', self.labelnames + ('le',), key + (_number(bound),), count))
+            samples.append(('_sum', self.labelnames, key, round(series['sum'], 6)))
+            samples.append(('_count', self.labelnames, key, series['count']))
+        return samples
+
+
+class RollingRate:
+    """Events per minute over the last `window` seconds"""
+    def __init__(self, window=None):
+        self.window = window or float(os.getenv('METRICS_RATE_WINDOW', 300))
+        self.events = deque(); self.lock = threading.Lock()
+
+    def mark(self):
+        with self.lock: self.events.append(time.time()); self._trim()
+
+    def _trim(self):
+        cutoff = time.time() - self.window
+        while self.events and self.events[0] < cutoff: self.events.popleft()
+
+    def per_minute(self):
+        with self.lock:
+            self._trim()
+            if not self.events: return 0.0
+            span = min(self.window, max(time.time() - self.events[0], 1.0))
+            return round(len(self.events) / span * 60, 2)
+
+
+class Registry:
+    """Process-wide collection of metrics rendered in the Prometheus text exposition format"""
+    def __init__(self):
+        self.metrics = {}; self.lock = threading.Lock()
+
+    def _register(self, cls, name, *args, **kwargs):
+        with self.lock:
+            if name not in self.metrics: self.metrics[name] = cls(name, *args, **kwargs)
+            return self.metrics[name]
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name, documentation, labelnames=()):
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def render(self):
+        with self.lock: metrics = list(self.metrics.values())
+        return ''.join(metric.render() + '\n' for metric in metrics)
+
+
+REGISTRY = Registry()
+
+
+def process_tree_rss_bytes(root_pid=None):
+    """Resident memory of a process and all its descendants (Chromium, chromedriver), Linux only"""
+    root_pid = root_pid or os.getpid(); children = {}; rss = {}
+    for pid in filter(str.isdigit, os.listdir('/proc')):
+        try:
+            with open(f'/proc/{pid}/stat') as f: ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+            with open(f'/proc/{pid}/statm') as f: rss[int(pid)] = int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+            children.setdefault(ppid, []).append(int(pid))
+        except (OSError, ValueError, IndexError):
+            continue
+    total = 0; stack = [root_pid]
+    while stack:
+        pid = stack.pop(); total += rss.get(pid, 0); stack.extend(children.get(pid, []))
+    return total
@@ -0,0 +1,122 @@
+# patients.py
+import os
+import csv
+import uuid
+import hashlib
+import tempfile
+import threading
+from collections import deque
+
+FINAL_STATUSES = ('Done', 'Bad')
+
+
+class UploadSpool:
+    """Receives an uploaded CSV as ordered chunks and spools it straight to disk"""
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.getenv('UPLOAD_DIR', os.path.join(tempfile.gettempdir(), 'quantum-uploads'))
+        self.max_bytes = max_bytes or int(os.getenv('UPLOAD_MAX_BYTES', 512 * 1024 * 1024))
+        os.makedirs(self.directory, exist_ok=True)
+        self.uploads = {}; self.lock = threading.Lock()
+
+    def begin(self, owner=None):
+        upload_id = uuid.uuid4().hex
+        path = os.path.join(self.directory, f"{upload_id}.csv")
+        open(path, 'wb').close()
+        with self.lock: self.uploads[upload_id] = {'path': path, 'owner': owner, 'next_seq': 0, 'bytes': 0}
+        return upload_id
+
+    def append(self, upload_id, seq, data):
+        upload = self.uploads.get(upload_id)
+        if not upload: raise ValueError("Unknown upload.")
+        if seq != upload['next_seq']: raise ValueError(f"Expected chunk {upload['next_seq']}, got {seq}.")
+        payload = data.encode('utf-8') if isinstance(data, str) else bytes(data)
+        if upload['bytes'] + len(payload) > self.max_bytes: raise ValueError("Upload exceeds the size limit.")
+        with open(upload['path'], 'ab') as f: f.write(payload)
+        upload['next_seq'] += 1; upload['bytes'] += len(payload)
+        return upload['bytes']
+
+    def finish(self, upload_id):
+        with self.lock: upload = self.uploads.pop(upload_id, None)
+        if not upload: raise ValueError("Unknown upload.")
+        return upload['path']
+
+    def from_text(self, content):
+        upload_id = self.begin(); self.append(upload_id, 0, content)
+        return self.finish(upload_id)
+
+    def abandon(self, owner):
+        """Drop uploads an owner started but never handed to a job"""
+        with self.lock:
+            stale = [upload_id for upload_id, upload in self.uploads.items() if upload['owner'] == owner]
+            paths = [self.uploads.pop(upload_id)['path'] for upload_id in stale]
+        for path in paths: self.discard(path)
+
+    def discard(self, path):
+        if path and os.path.exists(path): os.remove(path)
+
+
+class PatientFile:
+    """One streaming pass over a patient CSV into per-row name and status lists; duplicate names stay separate rows"""
+    def __init__(self, path):
+        self.path = path; self.names = []; self.statuses = []; self.waiting = {}
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''): digest.update(block)
+        self.key = digest.hexdigest()[:16]
+        with open(path, newline='', encoding='utf-8-sig') as f:
+            reader = csv.reader(f); header = next(reader, [])
+            if 'Name' not in header: raise ValueError("The CSV file has no 'Name' column.")
+            name_col = header.index('Name'); status_col = header.index('Status') if 'Status' in header else None
+            for row in reader:
+                self.names.append(row[name_col] if len(row) > name_col else '')
+                self.statuses.append(row[status_col] if status_col is not None and len(row) > status_col else '')
+
+    def __len__(self):
+        return len(self.names)
+
+    def _pending_rows(self):
+        return [row for row, name in enumerate(self.names) if name and self.statuses[row] not in FINAL_STATUSES]
+
+    def pending(self):
+        return [self.names[row] for row in self._pending_rows()]
+
+    def start(self):
+        """Return the names to process, in file order, and queue their rows so results land on the right occurrence"""
+        rows = self._pending_rows(); self.waiting = {}
+        for row in rows: self.waiting.setdefault(self.names[row], deque()).append(row)
+        return [self.names[row] for row in rows]
+
+    def update(self, name, status):
+        """Record a result on the next unreported row for this name and return that row index"""
+        waiting = self.waiting.get(name)
+        row = waiting.popleft() if waiting else self.names.index(name)
+        self.statuses[row] = status
+        return row
+
+    def apply(self, statuses):
+        """Overlay journal statuses keyed by row index; name keys from older journals fill that name's pending rows"""
+        by_name = {key: status for key, status in statuses.items() if isinstance(key, str)}
+        for key, status in statuses.items():
+            if isinstance(key, int) and 0 <= key < len(self.statuses): self.statuses[key] = status
+        if by_name:
+            for row in self._pending_rows():
+                if self.names[row] in by_name: self.statuses[row] = by_name[self.names[row]]
+
+    def count(self, status):
+        return sum(1 for value in self.statuses if value == status)
+
+    def write_reports(self, full_path, bad_path):
+        """Stream the original file into the Full report with current statuses, collecting Bad rows alongside"""
+        with open(self.path, newline='', encoding='utf-8-sig') as src, \
+                open(full_path, 'w', newline='', encoding='utf-8') as full, open(bad_path, 'w', newline='', encoding='utf-8') as bad:
+            reader = csv.reader(src); full_writer = csv.writer(full); bad_writer = csv.writer(bad)
+            header = next(reader, []); insert_status = 'Status' not in header
+            if insert_status: header = header[:1] + ['Status'] + header[1:]
+            name_col = header.index('Name'); status_col = header.index('Status')
+            full_writer.writerow(header); bad_writer.writerow(['Name', 'Status'])
+            for index, row in enumerate(reader):
+                if insert_status: row = row[:1] + [''] + row[1:]
+                row += [''] * (len(header) - len(row))
+                status = self.statuses[index] if index < len(self.statuses) else row[status_col]; row[status_col] = status
+                full_writer.writerow(row)
+                if status == 'Bad': bad_writer.writerow([row[name_col], status])
@@ -1,23 +1,25 @@
 # server.py
+import startup
+startup.install()
 import eventlet
 eventlet.monkey_patch()
 
-import pandas as pd
-import io
+import time
 import threading
 import os
 import base64
 import json
+import tempfile
 from datetime import datetime
-from flask import Flask, Response
-from flask_socketio import SocketIO, emit
+from flask import Flask, Response, jsonify, request
+from flask_socketio import SocketIO, emit, join_room
 from flask_cors import CORS
-from worker import QuantumBot
-import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
-from email.mime.base import MIMEBase
-from email import encoders
+from bot_host import BotHostClient, RemoteBot
+from journal import CheckpointJournal
+from jobs import Job, JobScheduler
+from delivery import DeliveryQueue
+from patients import UploadSpool, PatientFile
+from metrics import REGISTRY
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -30,65 +32,157 @@ FRONTEND_ORIGIN = "https://quantbot.netlify.app"
 CORS(app, resources={r"/*": {"origins": FRONTEND_ORIGIN}})
 socketio = SocketIO(app, cors_allowed_origins=FRONTEND_ORIGIN, async_mode='eventlet')
 
-bot_instance = None
-session_data = {}
-automation_thread = None
+# Selenium runs in a separate worker process so blocking WebDriver calls never stall the eventlet hub.
+# Each job's bot is keyed by the job id, which is also the Socket.IO room its progress goes to.
+bot_host = BotHostClient(lambda bot_id, event, data: socketio.emit(event, data, to=bot_id), start_task=socketio.start_background_task)
+sid_jobs = {}
 
 class EmailService:
     def __init__(self):
         self.sender_email = os.getenv('EMAIL_SENDER')
         self.password = os.getenv('EMAIL_PASSWORD')
-        self.smtp_server = "smtp.gmail.com"; self.smtp_port = 587
+        self.smtp_server = os.getenv('SMTP_SERVER', "smtp.gmail.com"); self.smtp_port = int(os.getenv('SMTP_PORT', 587))
+        self.use_starttls = os.getenv('SMTP_STARTTLS', '1') == '1'
+        self.gzip_threshold = int(os.getenv('ATTACHMENT_GZIP_BYTES', 1000000))
+        self.server = None
         if not self.sender_email or not self.password:
             print("[Email] WARNING: Email credentials not found in environment variables.")
-    
+
+    @property
+    def configured(self):
+        return bool(self.sender_email and self.password)
+
+    def _connection(self):
+        """Reuse the open SMTP session while it still answers NOOP, otherwise reconnect"""
+        if self.server:
+            try:
+                if self.server.noop()[0] == 250: return self.server
+            except Exception:
+                pass
+            self.close()
+        import smtplib
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=60)
+        server.ehlo()
+        if self.use_starttls: server.starttls(); server.ehlo()
+        if server.has_extn('auth'): server.login(self.sender_email, self.password)
+        self.server = server
+        return server
+
+    def close(self):
+        if self.server:
+            try: self.server.quit()
+            except Exception: pass
+            self.server = None
+
     def send_report(self, recipients, subject, body, attachments=None):
-        if not self.sender_email or not self.password: return False
+        if not self.configured: return False
+        import gzip
+        from email import encoders
+        from email.mime.base import MIMEBase
+        from email.mime.multipart import MIMEMultipart
+        from email.mime.text import MIMEText
         try:
             msg = MIMEMultipart(); msg['From'] = self.sender_email; msg['To'] = ", ".join(recipients); msg['Subject'] = subject
             msg.attach(MIMEText(body, 'html'))
             if attachments:
                 for filename, content in attachments.items():
-                    part = MIMEBase('application', 'octet-stream'); part.set_payload(content.encode('utf-8'))
+                    payload = content.encode('utf-8') if isinstance(content, str) else content
+                    if len(payload) > self.gzip_threshold: payload = gzip.compress(payload); filename = f"{filename}.gz"
+                    part = MIMEBase('application', 'octet-stream'); part.set_payload(payload)
                     encoders.encode_base64(part); part.add_header('Content-Disposition', f'attachment; filename="{filename}"')
                     msg.attach(part)
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(); server.login(self.sender_email, self.password); server.send_message(msg)
+            self._connection().send_message(msg)
             print(f"Email sent successfully to {', '.join(recipients)}"); return True
         except Exception as e:
-            print(f"Failed to send email: {e}"); return False
+            print(f"Failed to send email: {e}"); self.close(); return False
 
 class GoogleDriveService:
     def __init__(self):
         self.creds = None; self.service = None
         self.folder_id = os.getenv('GOOGLE_DRIVE_FOLDER_ID')
         try:
-            from google.oauth2 import service_account
-            from googleapiclient.discovery import build
             base64_creds = os.getenv('GDRIVE_SA_KEY_BASE64')
             if not base64_creds or not self.folder_id:
                 raise ValueError("Google Drive secrets not found.")
+            from google.oauth2 import service_account
+            from googleapiclient.discovery import build, build_from_document
             creds_json = base64.b64decode(base64_creds).decode('utf-8'); creds_dict = json.loads(creds_json)
             self.creds = service_account.Credentials.from_service_account_info(creds_dict, scopes=['https://www.googleapis.com/auth/drive'])
-            self.service = build('drive', 'v3', credentials=self.creds)
+            endpoint = os.getenv('GDRIVE_API_ENDPOINT')
+            client_options = {'api_endpoint': endpoint} if endpoint else None
+            # The discovery document is cached on disk so later builds need no network round-trip.
+            cache_path = os.getenv('GDRIVE_DISCOVERY_CACHE', 'config/drive_v3_discovery.json')
+            if os.path.exists(cache_path):
+                with open(cache_path, encoding='utf-8') as f:
+                    self.service = build_from_document(f.read(), credentials=self.creds, client_options=client_options)
+            else:
+                self.service = build('drive', 'v3', credentials=self.creds, client_options=client_options)
+                try:
+                    os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+                    with open(cache_path, 'w', encoding='utf-8') as f: json.dump(self.service._rootDesc, f)
+                except (OSError, AttributeError, TypeError) as e:
+                    print(f"[G-Drive] Could not cache the discovery document: {e}")
             print("[G-Drive] Service initialized securely from environment variables.")
         except Exception as e:
             print(f"[G-Drive] CRITICAL ERROR: Could not initialize Google Drive service: {e}")
-    
-    def upload_file(self, filename, file_content):
+
+    @property
+    def configured(self):
+        return bool(os.getenv('GDRIVE_SA_KEY_BASE64') and self.folder_id)
+
+    def upload_file(self, filename, path):
         if not self.service: return False
         try:
-            from googleapiclient.http import MediaIoBaseUpload
+            from googleapiclient.http import MediaFileUpload
             file_metadata = {'name': filename, 'parents': [self.folder_id]}
-            media = MediaIoBaseUpload(io.BytesIO(file_content.encode('utf-8')), mimetype='text/csv', resumable=True)
+            media = MediaFileUpload(path, mimetype='text/csv', resumable=True, chunksize=8 * 1024 * 1024)
             self.service.files().create(body=file_metadata, media_body=media, fields='id').execute()
             print(f"[G-Drive] File '{filename}' uploaded successfully.")
             return True
         except Exception as e:
             print(f"[G-Drive] ERROR: File upload failed: {e}"); return False
 
-email_service = EmailService()
-drive_service = GoogleDriveService()
+# Email and Drive clients are built on first use so none of their imports or credential work delays the healthcheck.
+services = {}
+services_lock = threading.Lock()
+
+def get_service(name):
+    with services_lock:
+        cached = services.get(name)
+        # A configured Drive client whose build failed is rebuilt on the next delivery rather than kept for good.
+        if cached is None or (name == 'drive' and cached.configured and not cached.service):
+            with startup.phase(f"{name} service"):
+                services[name] = {'email': EmailService, 'drive': GoogleDriveService}[name]()
+        return services[name]
+
+def close_email_service():
+    if 'email' in services: services['email'].close()
+
+def read_attachment(path):
+    with open(path, 'rb') as f: return f.read()
+
+def deliver_email(payload, attachments):
+    email_service = get_service('email')
+    if not email_service.configured: print("[Email] Not configured; dropping report email."); return True
+    return email_service.send_report(payload['recipients'], payload['subject'], payload['body'],
+                                     {name: read_attachment(path) for name, path in attachments.items()})
+
+def deliver_drive(payload, attachments):
+    drive_service = get_service('drive')
+    if not drive_service.configured: print("[G-Drive] Not configured; skipping upload."); return True
+    if not drive_service.service: print("[G-Drive] Service unavailable; the upload will be retried."); return False
+    return drive_service.upload_file(payload['filename'], attachments[payload['filename']])
+
+def report_delivery_update(item, state):
+    if item.get('room'):
+        socketio.emit('report_status', {'id': item['id'], 'kind': item['kind'], 'state': state, 'attempts': item['attempts']}, to=item['room'])
+
+# Reports leave the automation thread through a persistent outbox that retries with backoff.
+delivery_queue = DeliveryQueue({'email': deliver_email, 'drive': deliver_drive}, start_task=socketio.start_background_task,
+                               on_update=report_delivery_update, on_idle=close_email_service)
+
+# Patient CSVs arrive in chunks and are spooled to disk; jobs only ever hold the file path.
+uploads = UploadSpool()
 
 def get_email_list():
     try:
@@ -97,89 +191,216 @@ def get_email_list():
     except FileNotFoundError:
         return []
 
-def run_automation_process(session_id):
-    global bot_instance
-    results = []; is_terminated = False; is_crash = False
+def start_job(job):
+    socketio.start_background_task(initialize_job, job)
+
+def initialize_job(job):
+    # The bot is only attached to the job once the launch returns; a job released meanwhile is cleaned up
+    # here, so the browser is never shut down on the bot host while it is still being launched.
+    bot = RemoteBot(bot_host, job.id, **job.options)
+    started = time.time()
+    is_success, error_message = bot.initialize_driver()
+    if job.state != 'initializing':
+        bot.shutdown(); return
+    job.bot = bot
+    if is_success:
+        job.state = 'ready'
+        socketio.start_background_task(expire_idle_job, job)
+        elapsed_ms = round((time.time() - started) * 1000); BOT_INITIALIZE_SECONDS.observe(elapsed_ms / 1000)
+        print(f"[Metrics] job={job.id} time_to_bot_initialized_ms={elapsed_ms}")
+        socketio.emit('bot_initialized', {'elapsed_ms': elapsed_ms, 'job_id': job.id}, to=job.room)
+    else:
+        socketio.emit('error', {'message': f'Failed to initialize automation bot: {error_message}'}, to=job.room)
+        release_job(job, 'failed', error_message)
+
+def expire_idle_job(job):
+    socketio.sleep(int(os.getenv('JOB_LOGIN_TIMEOUT', 900)))
+    if job.state == 'ready':
+        socketio.emit('error', {'message': 'Login was not completed in time; the session was released.'}, to=job.room)
+        release_job(job, 'cancelled', 'Login timed out.')
+
+def release_job(job, state='finished', message=None):
+    if job.bot: job.bot.shutdown(); job.bot = None
+    uploads.discard(job.data.get('csv_path'))
+    if job.state == 'queued': scheduler.cancel(job)
+    else: scheduler.finish(job, state, message)
+
+scheduler = JobScheduler(start_job)
+
+# Server-side series for /metrics; per-step bot timings and outcomes come from the worker process registry.
+BOT_INITIALIZE_SECONDS = REGISTRY.histogram('quantum_bot_initialize_seconds', 'Time from job start to a ready browser')
+JOBS_BY_STATE = REGISTRY.gauge('quantum_jobs', 'Jobs known to the scheduler by state', ('state',))
+REGISTRY.gauge('quantum_browser_capacity', 'Browsers the scheduler may run at once').set_function(lambda: scheduler.capacity)
+REGISTRY.gauge('quantum_browsers_in_use', 'Browsers reserved by active jobs').set_function(lambda: scheduler.in_use())
+REGISTRY.gauge('quantum_patients_remaining', 'Patients still to process in running jobs').set_function(
+    lambda: sum(max(0, job.total - job.processed) for job in list(scheduler.jobs.values()) if job.state == 'running'))
+
+def run_automation_process(job):
+    results = []; is_terminated = False; is_crash = False; journal = None; patients = None; resumed = 0
+    job.state = 'running'
     try:
-        data = session_data.get(session_id, {}); csv_content = data.get('csv_content')
-        df = pd.read_csv(io.StringIO(csv_content));
-        if 'Status' not in df.columns: df.insert(1, 'Status', '')
-        patient_list = df[(df['Status'] != 'Done') & (df['Status'] != 'Bad')]['Name'].tolist()
-        socketio.emit('initial_stats', {'total': len(patient_list)})
-        results = bot_instance.process_patient_list(patient_list)
-        is_terminated = bot_instance.termination_event.is_set()
+        patients = PatientFile(job.data.get('csv_path'))
+        journal = CheckpointJournal(patients.key)
+        pending_before = len(patients.pending()); patients.apply(journal.replay())
+        patient_list = patients.start(); resumed = pending_before - len(patient_list)
+        if resumed:
+            print(f"[Journal] Resuming {journal.key}: skipping {resumed} patients already processed.")
+            socketio.emit('micro_status_update', {'message': f'Resuming previous run: skipping {resumed} processed patients...'}, to=job.room)
+        job.total = len(patient_list)
+        socketio.emit('initial_stats', {'total': len(patient_list)}, to=job.room)
+        report_every = int(os.getenv('PROGRESS_REPORT_EVERY', 500))
+        def on_result(name, status):
+            journal.append(name, status, patients.update(name, status)); job.record_result(status)
+            if report_every and job.processed % report_every == 0 and job.processed < job.total:
+                socketio.start_background_task(send_progress_report, job, patients)
+        results = job.bot.process_patient_list(patient_list, on_result=on_result)
+        is_terminated = job.bot.termination_event.is_set()
     except Exception as e:
         print(f"Fatal error in automation thread: {e}"); is_crash = True
-        socketio.emit('error', {'message': f'A fatal error occurred: {e}'})
+        socketio.emit('error', {'message': f'A fatal error occurred: {e}'}, to=job.room)
     finally:
-        socketio.emit('micro_status_update', {'message': 'Generating final reports...'})
-        generate_and_send_reports(session_id, results, is_crash_report=is_crash, is_terminated=is_terminated)
-        if bot_instance: bot_instance.shutdown(); bot_instance = None
-        if session_id in session_data: del session_data[session_id]
-
-def generate_and_send_reports(session_id, results, is_crash_report=False, is_terminated=False):
-    if not results:
-        socketio.emit('process_complete', {'message': 'No patients were processed.'}); return
-    data = session_data.get(session_id, {}); original_df = pd.read_csv(io.StringIO(data.get('csv_content')))
-    if 'Status' not in original_df.columns: original_df.insert(1, 'Status', '')
-    result_df = pd.DataFrame(results).set_index('Name'); original_df.set_index('Name', inplace=True)
-    original_df.update(result_df); full_df = original_df.reset_index()
-    bad_df = full_df[full_df['Status'] == 'Bad'][['Name', 'Status']]
-    timestamp = datetime.now().strftime("%d_%b_%Y"); custom_name = data.get('filename') or timestamp
+        socketio.emit('micro_status_update', {'message': 'Generating final reports...'}, to=job.room)
+        if journal: journal.close()
+        generate_and_send_reports(job, results, patients, resumed, is_crash_report=is_crash, is_terminated=is_terminated)
+        release_job(job, 'failed' if is_crash else 'cancelled' if is_terminated else 'finished')
+
+def report_name(job):
+    return job.data.get('filename') or datetime.now().strftime("%d_%b_%Y")
+
+def send_progress_report(job, patients):
+    custom_name = report_name(job)
+    try:
+        with tempfile.TemporaryDirectory(prefix='quantum-report-') as directory:
+            full_path = os.path.join(directory, 'full.csv'); patients.write_reports(full_path, os.path.join(directory, 'bad.csv'))
+            subject = f"Automation Progress [{job.processed}/{job.total}]: {custom_name}"
+            body = f"""<html><body><h2>Hillside's Quantum Automation Progress</h2><p><b>The process is still running.</b></p><p><b>Processed so far:</b> {job.processed} of {job.total}</p><p><b>Successful ('Done'):</b> {patients.count('Done')}</p><p><b>Bad State ('Bad'):</b> {patients.count('Bad')}</p><p>The report so far is attached.</p></body></html>"""
+            delivery_queue.enqueue('email', {'recipients': job.data.get('emails'), 'subject': subject, 'body': body},
+                                   files={f"{custom_name}_Progress.csv": full_path}, room=job.room)
+    except OSError as e:
+        print(f"[Report] Could not build progress report for job {job.id}: {e}")
+
+def generate_and_send_reports(job, results, patients=None, resumed=0, is_crash_report=False, is_terminated=False):
+    if patients is None or not (results or job.processed or resumed):
+        socketio.emit('process_complete', {'message': 'No patients were processed.'}, to=job.room); return
+    data = job.data; custom_name = report_name(job)
     full_report_name = f"{custom_name}_Full.csv"; bad_report_name = f"{custom_name}_Bad.csv"
-    full_report_content = full_df.to_csv(index=False)
-    drive_service.upload_file(full_report_name, full_report_content)
-    attachments = {full_report_name: full_report_content, bad_report_name: bad_df.to_csv(index=False)}
     status_text = "terminated by user" if is_terminated else "crashed due to an error" if is_crash_report else "completed successfully"
     subject = f"Automation Report [{status_text.upper()}]: {custom_name}"
-    body = f"""<html><body><h2>Hillside's Quantum Automation Report</h2><p><b>The process was {status_text}.</b></p><p><b>Total Patients in File:</b> {len(full_df)}</p><p><b>Processed in this run:</b> {len(results)}</p><p><b>Successful ('Done'):</b> {len([r for r in results if r['Status'] == 'Done'])}</p><p><b>Bad State ('Bad'):</b> {len([r for r in results if r['Status'] == 'Bad'])}</p><p>The full report and a list of 'Bad' status patients from this run are attached.</p></body></html>"""
-    email_service.send_report(data.get('emails'), subject, body, attachments)
-    socketio.emit('process_complete', {'message': f'Process {status_text}. Report sent.'})
+    body = f"""<html><body><h2>Hillside's Quantum Automation Report</h2><p><b>The process was {status_text}.</b></p><p><b>Total Patients in File:</b> {len(patients)}</p><p><b>Processed in this run:</b> {len(results)}</p><p><b>Successful ('Done'):</b> {len([r for r in results if r['Status'] == 'Done'])}</p><p><b>Bad State ('Bad'):</b> {len([r for r in results if r['Status'] == 'Bad'])}</p><p>The full report and a list of 'Bad' status patients from this run are attached.</p></body></html>"""
+    with tempfile.TemporaryDirectory(prefix='quantum-report-') as directory:
+        full_path = os.path.join(directory, full_report_name); bad_path = os.path.join(directory, bad_report_name)
+        patients.write_reports(full_path, bad_path)
+        delivery_queue.enqueue('drive', {'filename': full_report_name}, files={full_report_name: full_path}, room=job.room)
+        delivery_queue.enqueue('email', {'recipients': data.get('emails'), 'subject': subject, 'body': body},
+                               files={full_report_name: full_path, bad_report_name: bad_path}, room=job.room)
+    job.message = f'Process {status_text}. Report queued for delivery.'
+    socketio.emit('process_complete', {'message': job.message}, to=job.room)
 
 @app.route('/')
 def status_page():
     APP_STATUS_HTML = """<!DOCTYPE html><html lang="en"><head><title>Hillside Automation API - Railway</title><style>body{font-family:-apple-system,BlinkMacSystemFont,Segoe UI,Roboto,Helvetica,Arial,sans-serif;display:flex;justify-content:center;align-items:center;height:100vh;margin:0;background:#f0f2f5;}.status-box{text-align:center;padding:40px 60px;background:white;border-radius:12px;box-shadow:0 8px 30px rgba(0,0,0,0.1);}h1{font-size:24px;color:#333;margin-bottom:10px;} .indicator{font-size:18px;font-weight:600;padding:8px 16px;border-radius:20px;}.active{color:#28a745;background-color:#e9f7ea;}.info{margin-top:20px;color:#666;}</style></head><body><div class="status-box"><h1>🚀 Hillside Automation API</h1><div class="indicator active">● Running on Railway</div><div class="info">Frontend: <a href="https://quantbot.netlify.app" target="_blank">quantbot.netlify.app</a></div></div></body></html>"""
     return Response(APP_STATUS_HTML)
 
+@app.route('/jobs')
+def jobs_page():
+    return jsonify(scheduler.snapshot())
+
+@app.route('/metrics')
+def metrics_page():
+    jobs = list(scheduler.jobs.values())
+    for state in ('queued', 'initializing', 'ready', 'running'):
+        JOBS_BY_STATE.set(sum(1 for job in jobs if job.state == state), state=state)
+    text = REGISTRY.render()
+    try: text += bot_host.call(None, 'metrics', timeout=5)
+    except Exception as e: print(f"[Metrics] Worker metrics unavailable: {e}")
+    return Response(text, mimetype='text/plain; version=0.0.4')
+
 @socketio.on('connect')
 def handle_connect():
     print(f'Frontend connected from: {FRONTEND_ORIGIN}')
     emit('email_list', {'emails': get_email_list()})
 
+def current_job():
+    return scheduler.get(sid_jobs.get(request.sid))
+
+@socketio.on('upload_begin')
+def handle_upload_begin(data=None):
+    # Large CSVs are sent as ordered upload_chunk events (keep each under the 1 MB Socket.IO buffer),
+    # then initialize_session names the upload_id instead of carrying the whole file as 'content'.
+    return {'upload_id': uploads.begin(owner=request.sid)}
+
+@socketio.on('upload_chunk')
+def handle_upload_chunk(data):
+    try:
+        return {'received': uploads.append(data['upload_id'], int(data['seq']), data['data'])}
+    except (KeyError, ValueError, OSError) as e:
+        return {'error': str(e)}
+
 @socketio.on('initialize_session')
 def handle_init(data):
-    session_id = 'user_session'; global bot_instance
-    session_data[session_id] = {'csv_content': data['content'], 'emails': data['emails'], 'filename': data['filename']}
-    if bot_instance: bot_instance.shutdown()
-    bot_instance = QuantumBot(socketio, app)
+    previous = current_job()
+    if previous and previous.state in ('queued', 'initializing', 'ready'): release_job(previous, 'cancelled')
+    try:
+        if int(data.get('workers') or 1) < 1: raise ValueError
+    except (TypeError, ValueError):
+        return emit('error', {'message': "'workers' must be a positive whole number."})
+    try:
+        csv_path = uploads.finish(data['upload_id']) if data.get('upload_id') else uploads.from_text(data['content'])
+    except (KeyError, ValueError, OSError) as e:
+        return emit('error', {'message': f'Could not read the uploaded file: {e}'})
+    job = Job(data.get('operator') or request.sid, request.sid, dict(data, csv_path=csv_path), capacity=scheduler.capacity)
+    sid_jobs[request.sid] = job.id; join_room(job.room)
+    scheduler.submit(job)
+    if job.state == 'queued':
+        emit('job_queued', {'job_id': job.id, 'position': scheduler.position(job)})
 
-    is_success, error_message = bot_instance.initialize_driver()
-    if is_success:
-        emit('bot_initialized')
-    else:
-        emit('error', {'message': f'Failed to initialize automation bot: {error_message}'})
+@socketio.on('join_job')
+def handle_join_job(data):
+    # A reconnecting client has a new sid; it re-attaches with the job id and the operator that created it,
+    # since job ids are listed publicly on /jobs.
+    job = scheduler.get((data or {}).get('job_id'))
+    if not job or not data.get('operator') or job.operator != data.get('operator'):
+        return emit('error', {'message': 'Job not found.'})
+    sid_jobs[request.sid] = job.id; job.sid = request.sid; join_room(job.room)
+    emit('job_joined', dict(job.to_dict(), position=scheduler.position(job)))
 
 @socketio.on('start_login')
 def handle_login(credentials):
-    if not bot_instance: return emit('error', {'message': 'Bot not initialized.'})
-    is_success, error_message = bot_instance.login(credentials['username'], credentials['password'])
+    job = current_job()
+    if not job or not job.bot: return emit('error', {'message': 'Bot not initialized.'})
+    is_success, error_message = job.bot.login(credentials['username'], credentials['password'])
     if is_success: emit('otp_required')
     else: emit('error', {'message': f'Login failed: {error_message}'})
 
 @socketio.on('submit_otp')
 def handle_otp(data):
-    if not bot_instance: return emit('error', {'message': 'Bot not initialized.'})
-    is_success, error_message = bot_instance.submit_otp(data['otp'])
+    job = current_job()
+    if not job or not job.bot: return emit('error', {'message': 'Bot not initialized.'})
+    is_success, error_message = job.bot.submit_otp(data['otp'])
     if is_success:
         emit('login_successful')
-        session_id = 'user_session'
-        # FIXED: Correct syntax for start_background_task
-        socketio.start_background_task(run_automation_process, session_id)
+        socketio.start_background_task(run_automation_process, job)
     else: emit('error', {'message': f'OTP failed: {error_message}'})
 
 @socketio.on('terminate_process')
 def handle_terminate():
-    if bot_instance: print("Termination signal received."); bot_instance.stop()
+    job = current_job()
+    if not job: return
+    print(f"Termination signal received for job {job.id}.")
+    if job.state == 'queued': release_job(job, 'cancelled'); emit('process_complete', {'message': 'Queued job cancelled.'})
+    elif job.state == 'running': job.bot.stop()
+    elif job.state in ('initializing', 'ready'): release_job(job, 'cancelled')
+
+@socketio.on('disconnect')
+def handle_disconnect():
+    # Running jobs carry on and still email their report; jobs still waiting for login give their slot back.
+    uploads.abandon(request.sid)
+    job = scheduler.get(sid_jobs.pop(request.sid, None))
+    if job and job.sid == request.sid and job.state in ('queued', 'initializing', 'ready'): release_job(job, 'cancelled')
+
+@socketio.on('latency_probe')
+def handle_latency_probe(data=None):
+    return {'server_time': datetime.now().timestamp()}
 
 if __name__ == '__main__':
     print("====================================================================")
@@ -187,4 +408,7 @@ if __name__ == '__main__':
     print(f"  Frontend URL: {FRONTEND_ORIGIN}")
     print(f"  Port: {os.getenv('PORT', 7860)}")
     print("====================================================================")
+    with startup.phase('bot_host.start'): bot_host.start()
+    with startup.phase('delivery_queue.start'): delivery_queue.start()
+    startup.report()
     socketio.run(app, host='0.0.0.0', port=int(os.getenv('PORT', 7860)))
@@ -0,0 +1,70 @@
+# startup.py
+import os
+import sys
+import time
+
+ENABLED = os.getenv('STARTUP_PROFILE', '0') == '1'
+STARTED = time.perf_counter()
+imports = {}
+phases = []
+
+
+class _TimedLoader:
+    """Wraps a module loader to time exec_module, including the imports it triggers"""
+    def __init__(self, loader):
+        self.loader = loader
+
+    def __getattr__(self, name):
+        return getattr(self.loader, name)
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        started = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            imports[module.__name__] = time.perf_counter() - started
+
+
+class _ImportTimer:
+    """sys.meta_path hook that hands every found module a timing loader"""
+    def find_spec(self, name, path=None, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'): continue
+            spec = finder.find_spec(name, path, target)
+            if spec is None: continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'): spec.loader = _TimedLoader(spec.loader)
+            return spec
+        return None
+
+
+def install():
+    """Start timing imports when STARTUP_PROFILE=1; call before any heavy import"""
+    if ENABLED and not any(isinstance(finder, _ImportTimer) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _ImportTimer())
+
+
+class phase:
+    """Context manager recording how long a named startup or lazy-init step took"""
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.started
+        phases.append((self.name, elapsed))
+        if ENABLED: print(f"[Startup] {self.name}: {elapsed * 1000:.0f} ms")
+
+
+def report(limit=15):
+    if not ENABLED: return
+    print(f"[Startup] Ready after {(time.perf_counter() - STARTED) * 1000:.0f} ms.")
+    top_level = sorted(((name, seconds) for name, seconds in imports.items() if '.' not in name), key=lambda item: -item[1])
+    for name, seconds in top_level[:limit]:
+        print(f"[Startup]   import {name:<28} {seconds * 1000:8.1f} ms")
+    for name, seconds in phases:
+        print(f"[Startup]   init   {name:<28} {seconds * 1000:8.1f} ms")
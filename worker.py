@@ -4,6 +4,10 @@ import threading
 import tempfile
 import shutil
 import os
+import queue
+import json
+from collections import deque
+from contextlib import contextmanager
 
 from selenium import webdriver
 from selenium.webdriver.chrome.service import Service as ChromeService
@@ -11,11 +15,435 @@ from selenium.webdriver.chrome.options import Options as ChromeOptions
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException, InvalidSessionIdException, InvalidSelectorException, InvalidArgumentException
+
+from http_engine import GatewayHttpEngine
+from metrics import REGISTRY, RollingRate, process_tree_rss_bytes
+
+GATEWAY_URL = os.getenv('QUANTUM_GATEWAY_URL', 'https://gateway.quantumepay.com').rstrip('/')
+USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
+
+TABLE_ROWS_SCRIPT = """
+if (document.querySelector("div.table-wrapper table[aria-busy='true']")) return null;
+const rows = Array.from(document.querySelectorAll("div.table-wrapper tbody tr"));
+const needle = arguments[0].toLowerCase();
+if (rows.length === 0 || rows.some(r => r.classList.contains('b-table-empty-row'))) return 'empty';
+return rows.every(r => r.innerText.toLowerCase().includes(needle)) ? 'match' : null;
+"""
+
+PRESCAN_ROWS_SCRIPT = """
+return Array.from(document.querySelectorAll("div.table-wrapper tbody tr:not(.b-table-empty-row)")).map(r => {
+  const detail = Array.from(r.querySelectorAll('a[href]')).find(a => a.textContent.trim() === 'Transaction Detail');
+  const href = detail && !detail.getAttribute('href').startsWith('#') ? detail.href : null;
+  return {cells: Array.from(r.cells).map(c => c.textContent.trim()), id: r.getAttribute('data-id') || r.id || null, href: href};
+});
+"""
+STEP_SECONDS = REGISTRY.histogram('quantum_step_seconds', 'Duration of named bot steps', ('step', 'outcome'))
+PATIENT_SECONDS = REGISTRY.histogram('quantum_patient_seconds', 'End-to-end time per patient', ('status',), buckets=(1, 2, 5, 10, 20, 30, 60, 120, 300))
+PATIENTS_TOTAL = REGISTRY.counter('quantum_patients_processed_total', 'Patients processed by outcome', ('status',))
+SEARCH_RETRIES = REGISTRY.counter('quantum_search_retries_total', 'Search attempts that had to be retried')
+PATIENT_RETRIES = REGISTRY.counter('quantum_patient_retries_total', 'Error outcomes re-queued for another attempt', ('reason',))
+DRIVER_RECOVERIES = REGISTRY.counter('quantum_driver_recoveries_total', 'Browser relaunches after a crash or hang', ('outcome',))
+QUEUE_DEPTH = REGISTRY.gauge('quantum_patient_queue_depth', 'Patients waiting in bot work queues')
+PATIENT_RATE = RollingRate()
+REGISTRY.gauge('quantum_patients_per_minute', 'Rolling patients/minute across all bots').set_function(PATIENT_RATE.per_minute)
+REGISTRY.gauge('quantum_worker_rss_bytes', 'Resident memory of the bot worker process and its browsers').set_function(process_tree_rss_bytes)
+
+NEXT_PAGE_XPATH = "//ul[contains(@class, 'pagination')]//li[not(contains(@class, 'disabled'))]/button[@aria-label='Go to next page']"
+LAST_PAGE_XPATH = "//ul[contains(@class, 'pagination')]/li[last()][contains(@class, 'disabled')]"
+
+
+DRIVER_DEAD_MARKERS = ('invalid session id', 'chrome not reachable', 'disconnected', 'session deleted', 'no such window',
+                       'target window already closed', 'tab crashed', 'target crashed', 'connection refused', 'max retries exceeded')
+
+
+class PatientNotFound(Exception):
+    pass
+
+
+class SearchUnavailable(Exception):
+    """The search could not be run or its request failed, so an empty table proves nothing"""
+
+
+def classify_failure(error):
+    """'driver' when the browser itself is gone, 'permanent' when retrying cannot help, otherwise 'transient'"""
+    message = str(error).lower()
+    if isinstance(error, InvalidSessionIdException) or any(marker in message for marker in DRIVER_DEAD_MARKERS): return 'driver'
+    if isinstance(error, SearchUnavailable): return 'transient'
+    if isinstance(error, (InvalidSelectorException, InvalidArgumentException)): return 'permanent'
+    if isinstance(error, (WebDriverException, OSError, TimeoutError)): return 'transient'
+    return 'permanent'
+
+
+def normalize_name(name):
+    return ' '.join(str(name).split()).casefold()
+
+
+# Pre-scan entry for a patient known to be in the table but not bound to one row: always found by searching.
+PRESCAN_PRESENT = {'page': None, 'row': None, 'id': None, 'href': None}
+
+NAVIGATION_STATS_SCRIPT = """
+const nav = performance.getEntriesByType('navigation')[0] || {};
+const bytes = performance.getEntriesByType('resource').reduce((t, r) => t + (r.transferSize || 0), nav.transferSize || 0);
+return {bytes: bytes, load_ms: Math.round((nav.loadEventEnd || nav.duration || 0) - (nav.startTime || 0))};
+"""
+NO_ANIMATIONS_SCRIPT = """
+document.addEventListener('DOMContentLoaded', () => {
+  const style = document.createElement('style');
+  style.textContent = '*, *::before, *::after { transition: none !important; animation: none !important; }';
+  document.head.appendChild(style);
+});
+"""
+MEDIA_PATTERNS = ['*.png', '*.jpg', '*.jpeg', '*.gif', '*.svg', '*.webp', '*.ico', '*.mp4', '*.webm']
+FONT_PATTERNS = ['*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot', '*fonts.googleapis.com*', '*fonts.gstatic.com*']
+TRACKER_PATTERNS = ['*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*hotjar.com*',
+                    '*facebook.net*', '*segment.io*', '*sentry.io*', '*intercom.io*', '*clarity.ms*']
+
+# Named browser profiles. Stylesheets are never blocked: the flow relies on CSS visibility to tell
+# open modals and dropdowns from hidden ones.
+BROWSER_PROFILES = {
+    'full': {'blocked_urls': [], 'images': True, 'animations': True, 'args': []},
+    'lean': {'blocked_urls': MEDIA_PATTERNS + FONT_PATTERNS + TRACKER_PATTERNS, 'images': False, 'animations': True,
+             'args': ["--disable-remote-fonts"]},
+    'minimal': {'blocked_urls': MEDIA_PATTERNS + FONT_PATTERNS + TRACKER_PATTERNS, 'images': False, 'animations': False,
+                'args': ["--disable-remote-fonts", "--disable-smooth-scrolling", "--force-prefers-reduced-motion",
+                         "--disable-background-networking", "--disable-component-update", "--disable-sync", "--mute-audio"]},
+}
+
+
+def get_browser_profile(name=None):
+    name = (name or os.getenv('BROWSER_PROFILE', 'lean')).lower()
+    if name not in BROWSER_PROFILES:
+        print(f"[Bot] Unknown browser profile '{name}', using 'full'."); name = 'full'
+    profile = dict(BROWSER_PROFILES[name], name=name)
+    extra = [p.strip() for p in os.getenv('BROWSER_BLOCK_URLS', '').split(',') if p.strip()]
+    profile['blocked_urls'] = profile['blocked_urls'] + extra
+    return profile
+
+
+def launch_chrome(user_dir, cache_dir, profile=None):
+    profile = profile or get_browser_profile()
+    options = ChromeOptions()
+    
+    # Railway-specific Chrome configuration
+    options.binary_location = os.getenv('CHROME_BINARY', "/usr/bin/chromium")
+    options.add_argument(f"--user-data-dir={user_dir}")
+    options.add_argument(f"--disk-cache-dir={cache_dir}")
+    options.add_argument("--remote-debugging-port=0")
+    
+    # Headless and stability flags
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--disable-software-rasterizer")
+    options.add_argument("--no-first-run")
+    options.add_argument("--no-default-browser-check")
+    options.add_argument("--disable-extensions")
+    options.add_argument("--disable-plugins")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument("--disable-features=Translate,AutomationControlled")
+    
+    # User agent for better compatibility
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+
+    # Browser profile: skip image decoding and rendering work the flow does not need
+    if not profile['images']: options.add_argument("--blink-settings=imagesEnabled=false")
+    for argument in profile['args']: options.add_argument(argument)
+    
+    service = ChromeService(executable_path=os.getenv('CHROMEDRIVER_PATH', "/usr/bin/chromedriver"))
+    driver = webdriver.Chrome(service=service, options=options)
+    
+    # Anti-detection
+    driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
+        'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
+    })
+    if profile['blocked_urls']:
+        driver.execute_cdp_cmd('Network.enable', {})
+        driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': profile['blocked_urls']})
+    if not profile['animations']:
+        driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {'source': NO_ANIMATIONS_SCRIPT})
+    return driver
+
+
+class DriverPool:
+    """Keeps a few headless Chromium instances launched and health-checked so new sessions start warm"""
+    def __init__(self, size=None, max_uses=None, template_dir=None, profile=None):
+        self.profile = get_browser_profile(profile)
+        self.size = int(os.getenv('DRIVER_POOL_SIZE', 1)) if size is None else size
+        self.max_uses = max_uses or int(os.getenv('DRIVER_POOL_MAX_USES', 20))
+        self.template_dir = template_dir or os.getenv('CHROME_TEMPLATE_PROFILE')
+        self.idle = deque(); self.uses = {}; self.lock = threading.Lock()
+        self.wake = threading.Event(); self.closed = threading.Event(); self.thread = None
+
+    def start(self):
+        if self.size <= 0 or self.thread: return self
+        self.thread = threading.Thread(target=self._run, daemon=True); self.thread.start()
+        return self
+
+    def _build_template(self):
+        """Launch Chromium once against an empty profile so later copies skip first-run setup"""
+        self.template_dir = tempfile.mkdtemp(prefix="railway-chrome-template-")
+        cache_dir = tempfile.mkdtemp(prefix="railway-chrome-cache-")
+        try:
+            driver = launch_chrome(self.template_dir, cache_dir, self.profile); driver.get("about:blank"); driver.quit()
+        finally:
+            shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def _launch(self):
+        user_dir = tempfile.mkdtemp(prefix="railway-chrome-user-")
+        cache_dir = tempfile.mkdtemp(prefix="railway-chrome-cache-")
+        try:
+            shutil.copytree(self.template_dir, user_dir, dirs_exist_ok=True, ignore=shutil.ignore_patterns('Singleton*'))
+            driver = launch_chrome(user_dir, cache_dir, self.profile)
+        except Exception:
+            shutil.rmtree(user_dir, ignore_errors=True); shutil.rmtree(cache_dir, ignore_errors=True)
+            raise
+        self.uses[id(driver)] = 0
+        return driver, user_dir, cache_dir
+
+    def _healthy(self, driver):
+        try: return driver.execute_script("return 1;") == 1 and len(driver.window_handles) >= 1
+        except Exception: return False
+
+    def _discard(self, lease):
+        driver, user_dir, cache_dir = lease
+        self.uses.pop(id(driver), None)
+        try: driver.quit()
+        except Exception: pass
+        shutil.rmtree(user_dir, ignore_errors=True); shutil.rmtree(cache_dir, ignore_errors=True)
+
+    def _run(self):
+        while not self.closed.is_set():
+            try:
+                if not self.template_dir or not os.path.isdir(self.template_dir): self._build_template()
+                with self.lock: leases = list(self.idle); self.idle.clear()
+                healthy = [lease for lease in leases if self._healthy(lease[0])]
+                for lease in leases:
+                    if lease not in healthy: print("[Pool] Dropping unhealthy browser."); self._discard(lease)
+                while len(healthy) < self.size and not self.closed.is_set():
+                    started = time.time(); healthy.append(self._launch())
+                    print(f"[Pool] Warm browser ready in {time.time() - started:.1f}s.")
+                with self.lock: self.idle.extend(healthy)
+            except Exception as e:
+                print(f"[Pool] Could not launch a warm browser: {e}")
+            self.wake.wait(30); self.wake.clear()
+
+    def acquire(self, profile_name=None):
+        """Return a warm (driver, user_dir, cache_dir) or None if the pool is empty or on another profile"""
+        if profile_name and profile_name != self.profile['name']: return None
+        with self.lock:
+            lease = self.idle.popleft() if self.idle else None
+        self.wake.set()
+        if lease and not self._healthy(lease[0]):
+            self._discard(lease); return None
+        return lease
+
+    def discard(self, driver, user_dir, cache_dir):
+        """Throw away a leased browser that crashed instead of returning it to the pool"""
+        self._discard((driver, user_dir, cache_dir)); self.wake.set()
+
+    def release(self, driver, user_dir, cache_dir):
+        """Wipe a used browser and put it back, or recycle it once it has served max_uses sessions"""
+        lease = (driver, user_dir, cache_dir)
+        self.uses[id(driver)] = self.uses.get(id(driver), 0) + 1
+        try:
+            for handle in driver.window_handles[1:]: driver.switch_to.window(handle); driver.close()
+            driver.switch_to.window(driver.window_handles[0])
+            # sessionStorage (where the gateway token lives) survives navigation in this tab and is not covered by
+            # Storage.clearDataForOrigin, so clear it from the gateway origin itself before the next lease.
+            if not driver.current_url.startswith(GATEWAY_URL): driver.get(f"{GATEWAY_URL}/")
+            if driver.execute_script("sessionStorage.clear(); localStorage.clear(); return sessionStorage.length;") != 0:
+                raise RuntimeError("sessionStorage was not cleared")
+            driver.get("about:blank")
+            driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+            driver.execute_cdp_cmd('Network.clearBrowserCache', {})
+            driver.execute_cdp_cmd('Storage.clearDataForOrigin', {'origin': GATEWAY_URL, 'storageTypes': 'all'})
+            driver.get_log('performance')
+            reusable = self.uses[id(driver)] < self.max_uses and not self.closed.is_set()
+        except Exception as e:
+            print(f"[Pool] Could not wipe browser, recycling it: {e}"); reusable = False
+        with self.lock:
+            if reusable and len(self.idle) < self.size: self.idle.append(lease); return
+        self._discard(lease); self.wake.set()
+
+    def close(self):
+        self.closed.set(); self.wake.set()
+        with self.lock: leases = list(self.idle); self.idle.clear()
+        for lease in leases: self._discard(lease)
+
+
+class StepTimings:
+    """Rolling window of observed step durations used to size adaptive timeouts"""
+    def __init__(self, window=50, min_samples=20):
+        self.window = window; self.min_samples = min_samples
+        self.samples = {}; self.lock = threading.Lock()
+
+    def record(self, step, seconds):
+        with self.lock:
+            self.samples.setdefault(step, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, step, pct):
+        with self.lock:
+            values = sorted(self.samples.get(step, ()))
+        if not values: return None
+        return values[min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))]
+
+    def timeout_for(self, step, default):
+        with self.lock:
+            count = len(self.samples.get(step, ()))
+        if count < self.min_samples: return default
+        # Never below a third of the default, so one slow gateway moment cannot turn a run into timeouts.
+        return min(default * 2, max(default / 3, 2.0, self.percentile(step, 95) * 3))
+
+    def summary(self):
+        with self.lock: steps = list(self.samples)
+        return {step: {'count': len(self.samples[step]), 'p50': round(self.percentile(step, 50), 3),
+                       'p95': round(self.percentile(step, 95), 3)} for step in steps}
+
+
+class NetworkMonitor:
+    """Tracks in-flight XHR/Fetch requests from the CDP Network events in Chrome's performance log"""
+    TRACKED_TYPES = ('XHR', 'Fetch')
+
+    def __init__(self, driver, stale_after=15):
+        self.driver = driver; self.stale_after = stale_after
+        self.inflight = {}; self.bytes_received = 0; self.succeeded = 0; self.failed = 0
+
+    def poll(self):
+        now = time.time()
+        for entry in self.driver.get_log('performance'):
+            message = json.loads(entry['message']).get('message', {})
+            method = message.get('method'); params = message.get('params', {})
+            if method == 'Network.requestWillBeSent' and params.get('type') in self.TRACKED_TYPES:
+                self.inflight[params['requestId']] = now
+            elif method == 'Network.responseReceived' and params.get('requestId') in self.inflight:
+                if int(params.get('response', {}).get('status', 0)) >= 400: self.failed += 1
+                else: self.succeeded += 1
+            elif method in ('Network.loadingFinished', 'Network.loadingFailed'):
+                if method == 'Network.loadingFailed' and params.get('requestId') in self.inflight: self.failed += 1
+                self.inflight.pop(params.get('requestId'), None)
+                if method == 'Network.loadingFinished': self.bytes_received += int(params.get('encodedDataLength', 0))
+        for request_id, started in list(self.inflight.items()):
+            if now - started > self.stale_after: del self.inflight[request_id]
+        return len(self.inflight)
+
+    def wait_idle(self, timeout, idle_time=0.3):
+        deadline = time.time() + timeout; quiet_since = None
+        while time.time() < deadline:
+            if self.poll() == 0:
+                quiet_since = quiet_since or time.time()
+                if time.time() - quiet_since >= idle_time: return True
+            else:
+                quiet_since = None
+            time.sleep(0.05)
+        return False
+
+
+class WaitEngine:
+    """Condition-based waits that replace fixed sleeps and record how long each step took"""
+    def __init__(self, driver, timings, default_timeout):
+        self.driver = driver; self.timings = timings; self.default_timeout = default_timeout
+        try:
+            self.network = NetworkMonitor(driver); self.network.poll(); self.network.inflight.clear()
+        except Exception as e:
+            print(f"[Bot] Network monitoring unavailable, XHR waits disabled: {e}")
+            self.network = None
+
+    @contextmanager
+    def step(self, name):
+        started = time.time()
+        try:
+            yield
+        except Exception:
+            STEP_SECONDS.observe(time.time() - started, step=name, outcome='error'); raise
+        elapsed = time.time() - started
+        self.timings.record(name, elapsed); STEP_SECONDS.observe(elapsed, step=name, outcome='ok')
+
+    def timeout(self, name, default=None):
+        return self.timings.timeout_for(name, default or self.default_timeout)
+
+    def until(self, name, condition, default=None, adaptive=True):
+        """adaptive=False keeps the fixed default, for waits whose timeout decides the patient's outcome"""
+        timeout = self.timeout(name, default) if adaptive else (default or self.default_timeout)
+        with self.step(name):
+            return WebDriverWait(self.driver, timeout).until(condition)
+
+    def network_idle(self, name='network_idle', default=10):
+        if not self.network: return False
+        with self.step(name):
+            return self.network.wait_idle(self.timeout(name, default))
+
+    def table_filtered(self, patient_name, default=None):
+        """Wait until the table rows have re-rendered for the search term; returns 'match' or 'empty'"""
+        return self.until('table_filtered', lambda d: d.execute_script(TABLE_ROWS_SCRIPT, patient_name), default)
+
+    def gone(self, name, locator, default=None, adaptive=True):
+        return self.until(name, EC.invisibility_of_element_located(locator), default, adaptive)
+
+
+class ProgressAggregator:
+    """Collects bot progress and emits it as one batched 'progress_batch' frame per flush interval.
+
+    Frame contract, version 1:
+        {'v': 1, 'seq': int,                    # seq increases by one per frame
+         'micro_status': [str, ...],            # status lines since the last frame, oldest first, capped
+         'stats': {processed, remaining, workers} or None,   # latest stats, None if unchanged
+         'log': [{'name': str, 'status': str}, ...]}        # every patient outcome, in order, never dropped
+    Server-level events (initial_stats, prescan_report, error, process_complete) are still emitted on
+    their own. PROGRESS_FLUSH_MS=0 restores the legacy micro_status_update/stats_update/log_update events.
+    """
+    VERSION = 1
+
+    def __init__(self, socketio, app, interval_ms=None, max_status=20):
+        self.socketio = socketio; self.app = app
+        interval_ms = int(os.getenv('PROGRESS_FLUSH_MS', 250)) if interval_ms is None else interval_ms
+        self.interval = interval_ms / 1000; self.max_status = max_status
+        self.lock = threading.Lock(); self.flush_lock = threading.Lock()
+        self.statuses = deque(maxlen=max_status); self.latest_stats = None; self.outcomes = []
+        self.seq = 0; self.thread = None; self.closed = threading.Event()
+
+    def _emit(self, event, data):
+        with self.app.app_context():
+            self.socketio.emit(event, data)
+
+    def _add(self, legacy_event, data, apply):
+        if self.interval <= 0: return self._emit(legacy_event, data)
+        with self.lock:
+            apply()
+            if self.thread is None and not self.closed.is_set():
+                self.thread = threading.Thread(target=self._run, daemon=True); self.thread.start()
+
+    def status(self, message):
+        self._add('micro_status_update', {'message': message}, lambda: self.statuses.append(message))
+
+    def stats(self, payload):
+        self._add('stats_update', payload, lambda: setattr(self, 'latest_stats', payload))
+
+    def log(self, name, status):
+        self._add('log_update', {'name': name, 'status': status}, lambda: self.outcomes.append({'name': name, 'status': status}))
+
+    def _run(self):
+        while not self.closed.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        with self.flush_lock:
+            with self.lock:
+                if not (self.statuses or self.latest_stats or self.outcomes): return
+                frame = {'v': self.VERSION, 'seq': self.seq, 'micro_status': list(self.statuses),
+                         'stats': self.latest_stats, 'log': self.outcomes}
+                self.statuses.clear(); self.latest_stats = None; self.outcomes = []; self.seq += 1
+            self._emit('progress_batch', frame)
+
+    def close(self):
+        self.closed.set()
+        self.flush()
 
 
 class QuantumBot:
-    def __init__(self, socketio, app):
+    def __init__(self, socketio, app, num_workers=None, engine=None, driver_pool=None, profile=None):
         self.socketio = socketio
         self.app = app
         self.driver = None
@@ -23,47 +451,38 @@ class QuantumBot:
         self.termination_event = threading.Event()
         self.temp_user_dir = None
         self.temp_cache_dir = None
+        self.num_workers = max(1, int(num_workers or os.getenv('BOT_WORKERS', 1)))
+        self.label = None
+        self.timings = StepTimings()
+        self.waits = None
+        self.engine = (engine or os.getenv('BOT_ENGINE', 'selenium')).lower()
+        self.http_engine = None
+        self.prescan_enabled = os.getenv('BOT_PRESCAN', '1') == '1'
+        self.name_index = None
+        self.progress = ProgressAggregator(socketio, app)
+        self.driver_pool = driver_pool
+        self.pooled = False
+        self.profile = get_browser_profile(profile)
+        self.nav_stats = deque(maxlen=200)
+        self.session_state = None
+        self.last_failure = None
+        self.recoveries = 0
+        self.max_recoveries = int(os.getenv('BOT_MAX_RECOVERIES', 3))
+        self.broken = False
 
     def initialize_driver(self):
         try:
-            self.micro_status("Initializing headless browser...")
-            
-            # Create isolated temporary directories for Railway
-            self.temp_user_dir = tempfile.mkdtemp(prefix="railway-chrome-user-")
-            self.temp_cache_dir = tempfile.mkdtemp(prefix="railway-chrome-cache-")
-            
-            options = ChromeOptions()
-            
-            # Railway-specific Chrome configuration
-            options.binary_location = "/usr/bin/chromium"
-            options.add_argument(f"--user-data-dir={self.temp_user_dir}")
-            options.add_argument(f"--disk-cache-dir={self.temp_cache_dir}")
-            options.add_argument("--remote-debugging-port=0")
-            
-            # Headless and stability flags
-            options.add_argument("--headless=new")
-            options.add_argument("--no-sandbox")
-            options.add_argument("--disable-dev-shm-usage")
-            options.add_argument("--disable-gpu")
-            options.add_argument("--disable-software-rasterizer")
-            options.add_argument("--no-first-run")
-            options.add_argument("--no-default-browser-check")
-            options.add_argument("--disable-extensions")
-            options.add_argument("--disable-plugins")
-            options.add_argument("--window-size=1920,1080")
-            options.add_argument("--disable-features=Translate,AutomationControlled")
-            
-            # User agent for better compatibility
-            user_agent = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36"
-            options.add_argument(f"--user-agent={user_agent}")
-            
-            service = ChromeService(executable_path="/usr/bin/chromedriver")
-            self.driver = webdriver.Chrome(service=service, options=options)
-            
-            # Anti-detection
-            self.driver.execute_cdp_cmd('Page.addScriptToEvaluateOnNewDocument', {
-                'source': "Object.defineProperty(navigator, 'webdriver', {get: () => undefined})"
-            })
+            if not self.label: self.micro_status("Initializing headless browser...")
+            lease = self.driver_pool.acquire(self.profile['name']) if self.driver_pool else None
+            if lease:
+                self.driver, self.temp_user_dir, self.temp_cache_dir = lease; self.pooled = True
+                print("[Bot] Using a pre-warmed browser from the pool.")
+            else:
+                # Create isolated temporary directories for Railway
+                self.temp_user_dir = tempfile.mkdtemp(prefix="railway-chrome-user-")
+                self.temp_cache_dir = tempfile.mkdtemp(prefix="railway-chrome-cache-")
+                self.driver = launch_chrome(self.temp_user_dir, self.temp_cache_dir, self.profile)
+            self.waits = WaitEngine(self.driver, self.timings, self.DEFAULT_TIMEOUT)
             
             return True, None
             
@@ -73,6 +492,29 @@ class QuantumBot:
             self._cleanup_temp_dirs()
             return False, error_message
 
+    def _navigate(self, url):
+        """Load a page and record its page-load time and bytes transferred"""
+        with self.waits.step('page_load'):
+            self.driver.get(url)
+        try:
+            nav = self.driver.execute_script(NAVIGATION_STATS_SCRIPT) or {}
+            self.nav_stats.append({'url': url, 'bytes': int(nav.get('bytes', 0)), 'load_ms': int(nav.get('load_ms', 0))})
+        except Exception as e:
+            print(f"[Bot] Could not read navigation timing for {url}: {e}")
+
+    def _bytes_received(self):
+        if not (self.waits and self.waits.network): return 0
+        try: self.waits.network.poll()
+        except Exception: pass
+        return self.waits.network.bytes_received
+
+    def navigation_summary(self):
+        if not self.nav_stats: return {}
+        count = len(self.nav_stats)
+        return {'profile': self.profile['name'], 'navigations': count,
+                'avg_kb': round(sum(n['bytes'] for n in self.nav_stats) / count / 1024, 1),
+                'avg_load_ms': round(sum(n['load_ms'] for n in self.nav_stats) / count)}
+
     def _cleanup_temp_dirs(self):
         """Clean up temporary directories"""
         for temp_dir in [self.temp_user_dir, self.temp_cache_dir]:
@@ -80,9 +522,9 @@ class QuantumBot:
                 shutil.rmtree(temp_dir, ignore_errors=True)
 
     def micro_status(self, message):
+        if self.label: message = f"[{self.label}] {message}"
         print(f"[Bot Action] {message}")
-        with self.app.app_context():
-            self.socketio.emit('micro_status_update', {'message': message})
+        self.progress.status(message)
 
     def stop(self):
         self.micro_status("Termination signal received. Finishing current patient...")
@@ -91,22 +533,24 @@ class QuantumBot:
     def login(self, username, password):
         try:
             self.micro_status("Navigating to login page...")
-            self.driver.get("https://gateway.quantumepay.com/")
+            self._navigate(f"{GATEWAY_URL}/")
             time.sleep(2)
             self.micro_status("Entering credentials...")
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.presence_of_element_located((By.ID, "Username"))
-            ).send_keys(username)
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.presence_of_element_located((By.ID, "Password"))
-            ).send_keys(password)
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.ID, "login"))
-            ).click()
+            with self.waits.step('login_credentials'):
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.ID, "Username"))
+                ).send_keys(username)
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.ID, "Password"))
+                ).send_keys(password)
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.element_to_be_clickable((By.ID, "login"))
+                ).click()
             self.micro_status("Waiting for OTP screen...")
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.presence_of_element_located((By.ID, "code1"))
-            )
+            with self.waits.step('login_otp_screen'):
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.presence_of_element_located((By.ID, "code1"))
+                )
             return True, None
         except Exception as e:
             error_message = f"Error during login: {str(e)}"
@@ -117,109 +561,367 @@ class QuantumBot:
         try:
             self.micro_status(f"Submitting OTP...")
             otp_digits = list(otp)
-            for i in range(6):
-                self.driver.find_element(By.ID, f"code{i+1}").send_keys(otp_digits[i])
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.ID, "login"))
-            ).click()
+            with self.waits.step('otp_entry'):
+                for i in range(6):
+                    self.driver.find_element(By.ID, f"code{i+1}").send_keys(otp_digits[i])
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.element_to_be_clickable((By.ID, "login"))
+                ).click()
             self.micro_status("Verifying login success...")
+            with self.waits.step('otp_verify'):
+                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
+                    EC.element_to_be_clickable((By.XPATH, "//span[text()='Payments']"))
+                )
+            try: self.session_state = self.export_session()
+            except Exception as e: print(f"[Bot] Could not snapshot the session for crash recovery: {e}")
+            return True, None
+        except Exception as e:
+            error_message = f"Error during OTP submission: {str(e)}"
+            print(f"[Bot] ERROR during OTP submission: {error_message}")
+            return False, error_message
+
+    def export_session(self):
+        """Snapshot cookies and web storage of the authenticated session"""
+        storage = self.driver.execute_script(
+            "return {local: Object.assign({}, window.localStorage), session: Object.assign({}, window.sessionStorage)};"
+        ) or {}
+        return {'cookies': self.driver.get_cookies(), 'local': storage.get('local') or {}, 'session': storage.get('session') or {}}
+
+    def import_session(self, state):
+        """Load an exported session into this driver and verify it is authenticated"""
+        try:
+            self._navigate(f"{GATEWAY_URL}/")
+            for cookie in state.get('cookies', []):
+                cookie = {k: v for k, v in cookie.items() if k in ('name', 'value', 'path', 'domain', 'secure', 'httpOnly', 'expiry', 'sameSite')}
+                try: self.driver.add_cookie(cookie)
+                except Exception as e: print(f"[Bot] Could not restore cookie '{cookie.get('name')}': {e}")
+            self.driver.execute_script(
+                "for (const [k, v] of Object.entries(arguments[0])) window.localStorage.setItem(k, v);"
+                "for (const [k, v] of Object.entries(arguments[1])) window.sessionStorage.setItem(k, v);",
+                state.get('local', {}), state.get('session', {})
+            )
+            self._navigate(f"{GATEWAY_URL}/credit-card/void")
             WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
                 EC.element_to_be_clickable((By.XPATH, "//span[text()='Payments']"))
             )
             return True, None
         except Exception as e:
-            error_message = f"Error during OTP submission: {str(e)}"
-            print(f"[Bot] ERROR during OTP submission: {error_message}")
+            error_message = f"Error restoring session: {str(e)}"
+            print(f"[Bot] ERROR restoring session: {error_message}")
             return False, error_message
 
-    def process_patient_list(self, patient_list):
-        results = []
-        for index, patient_name in enumerate(patient_list):
-            if self.termination_event.is_set():
-                print("[Bot] Termination detected. Stopping process.")
-                break
-            with self.app.app_context():
-                self.socketio.emit('stats_update', {
-                    'processed': len(results),
-                    'remaining': len(patient_list) - len(results)
-                })
-            self.micro_status(f"Processing '{patient_name}' ({index + 1}/{len(patient_list)})...")
-            status = self._process_single_patient(patient_name)
-            results.append({'Name': patient_name, 'Status': status})
+    def _driver_responsive(self, timeout=5):
+        """Probe the browser from a side thread so a wedged renderer cannot hang the caller"""
+        result = {}
+        def probe():
+            try: result['ok'] = self.driver.execute_script("return document.readyState;") is not None
+            except Exception as e: result['ok'] = classify_failure(e) != 'driver'
+        thread = threading.Thread(target=probe, daemon=True); thread.start(); thread.join(timeout)
+        return result.get('ok', False)
+
+    def _dispose_driver(self, driver, user_dir, cache_dir, pooled):
+        if pooled and self.driver_pool: return self.driver_pool.discard(driver, user_dir, cache_dir)
+        try: driver.quit()
+        except Exception: pass
+        for temp_dir in (user_dir, cache_dir):
+            if temp_dir: shutil.rmtree(temp_dir, ignore_errors=True)
+
+    def recover_driver(self):
+        """Replace a dead or wedged browser with a fresh one and restore the session captured after the OTP"""
+        if not self.session_state or self.recoveries >= self.max_recoveries:
+            print(f"[Bot] Browser lost and cannot be recovered (recoveries used: {self.recoveries}).")
+            self.broken = True; return False
+        self.recoveries += 1
+        self.micro_status(f"Browser stopped responding; relaunching and restoring the session ({self.recoveries}/{self.max_recoveries})...")
+        old = (self.driver, self.temp_user_dir, self.temp_cache_dir, self.pooled)
+        self.driver = None; self.pooled = False; self.temp_user_dir = self.temp_cache_dir = None
+        # Quitting a hung browser can block for minutes, so it happens off the processing thread.
+        threading.Thread(target=self._dispose_driver, args=old, daemon=True).start()
+        is_success, error_message = self.initialize_driver()
+        if is_success: is_success, error_message = self.import_session(self.session_state)
+        DRIVER_RECOVERIES.inc(outcome='ok' if is_success else 'failed')
+        if not is_success:
+            print(f"[Bot] Browser recovery failed: {error_message}"); self.broken = True
+        return is_success
+
+    def _spawn_workers(self, count):
+        """Start extra headless drivers that share this bot's authenticated session"""
+        if count <= 0: return []
+        self.micro_status(f"Starting {count} additional browser worker(s)...")
+        state = self.export_session(); workers = []
+        for i in range(count):
+            worker = QuantumBot(self.socketio, self.app, num_workers=1, driver_pool=self.driver_pool, profile=self.profile['name'])
+            worker.termination_event = self.termination_event; worker.label = f"W{i + 2}"
+            worker.timings = self.timings; worker.http_engine = self.http_engine
+            worker.name_index = self.name_index; worker.progress = self.progress; worker.session_state = state
+            is_success, error_message = worker.initialize_driver()
+            if is_success: is_success, error_message = worker.import_session(state)
+            if is_success: workers.append(worker)
+            else:
+                print(f"[Bot] Worker {worker.label} unavailable, continuing without it: {error_message}")
+                worker.shutdown()
+        return workers
+
+    def prescan(self, patient_list, max_pages=None):
+        """Page through the void table once and index normalized patient name -> row location"""
+        max_pages = max_pages or int(os.getenv('BOT_PRESCAN_MAX_PAGES', 500))
+        try:
+            self.micro_status("Pre-scanning void transactions...")
+            self._navigate(f"{GATEWAY_URL}/credit-card/void")
+            self.waits.until('table_ready', EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'table-wrapper')]")))
+            self.waits.network_idle('prescan_page')
+            index = {}; ambiguous = set(); row_texts = []; rows_seen = 0; truncated = False
+            for page in range(1, max_pages + 1):
+                self.waits.until('prescan_rows', lambda d: d.execute_script(TABLE_ROWS_SCRIPT, ''))
+                rows = self.driver.execute_script(PRESCAN_ROWS_SCRIPT) or []
+                for position, row in enumerate(rows):
+                    entry = {'page': page, 'row': position, 'id': row.get('id'), 'href': row.get('href')}
+                    for cell in row.get('cells', []):
+                        key = normalize_name(cell) if cell else None
+                        if not key: continue
+                        if index.setdefault(key, entry) is not entry: ambiguous.add(key)
+                    row_texts.append((normalize_name(' '.join(row.get('cells', []))), entry))
+                rows_seen += len(rows)
+                next_buttons = self.driver.find_elements(By.XPATH, NEXT_PAGE_XPATH)
+                # Only a page with rows and a pager on its last page ends the table; an empty page is a failed
+                # fetch or a reload in progress, so the index is incomplete.
+                if not rows: truncated = True; break
+                if not next_buttons: truncated = not self.driver.find_elements(By.XPATH, LAST_PAGE_XPATH); break
+                if page == max_pages: truncated = True; break
+                first_row = rows[0].get('cells')
+                next_buttons[0].click()
+                self.waits.network_idle('prescan_page')
+                self.waits.until('prescan_next_page', lambda d: (d.execute_script(PRESCAN_ROWS_SCRIPT) or [{}])[0].get('cells') != first_row)
+            if rows_seen == 0:
+                print("[Bot] Pre-scan found no rows; searching every patient instead.")
+                return None
+            # Only an exact cell match that is unique across the table may bind a row; a substring hit
+            # ("Ann Lee" in "Joann Leeds") or a repeated name just marks the patient present, to be searched.
+            for key in ambiguous: index[key] = dict(PRESCAN_PRESENT)
+            missing = []
+            for name in patient_list:
+                key = normalize_name(name)
+                if key in index: continue
+                if truncated or any(key in text for text, entry in row_texts): index[key] = dict(PRESCAN_PRESENT)
+                else: missing.append(name)
+            if truncated: print(f"[Bot] Pre-scan stopped early at page {page}; unmatched patients will be searched.")
+            print(f"[Bot] Pre-scan indexed {rows_seen} rows over {page} page(s); {len(missing)} patient(s) have no transaction.")
             with self.app.app_context():
-                self.socketio.emit('log_update', {'name': patient_name, 'status': status})
-        return results
+                self.socketio.emit('prescan_report', {'rows': rows_seen, 'pages': page, 'missing': missing})
+            self.micro_status(f"Pre-scan complete: {len(patient_list) - len(missing)} matched, {len(missing)} not found.")
+            return index
+        except Exception as e:
+            print(f"[Bot] Pre-scan failed, searching every patient instead: {e}")
+            return None
+
+    def process_patient_list(self, patient_list, on_result=None):
+        total = len(patient_list)
+        if total == 0: return []
+        if self.engine == 'http' and not self.http_engine:
+            self.http_engine = GatewayHttpEngine(self.export_session(), GATEWAY_URL, USER_AGENT, pool_size=self.num_workers)
+        if self.prescan_enabled and self.name_index is None:
+            self.name_index = self.prescan(patient_list)
+        extra = self._spawn_workers(min(self.num_workers, total) - 1)
+        if extra: self.label = "W1"
+        workers = [self] + extra
+        work = queue.Queue()
+        for index, patient_name in enumerate(patient_list): work.put((index, patient_name, 0))
+        QUEUE_DEPTH.inc(total)
+        slots = [None] * total
+        stats = {'processed': 0, 'retried': 0, 'bytes': 0, 'started': time.time(), 'workers': {w.label or "W1": 0 for w in workers}}
+        lock = threading.Lock()
+        retry_limit = int(os.getenv('BOT_RETRY_PASSES', 1)); retry_delay = float(os.getenv('BOT_RETRY_DELAY', 2))
+
+        def finish(index, patient_name, status):
+            with lock:
+                slots[index] = {'Name': patient_name, 'Status': status}; stats['processed'] += 1
+            if on_result: on_result(patient_name, status)
+            self.progress.log(patient_name, status)
+
+        def run(bot):
+            name = bot.label or "W1"
+            while not bot.termination_event.is_set() and not bot.broken:
+                try: index, patient_name, attempt = work.get_nowait()
+                except queue.Empty: break
+                QUEUE_DEPTH.dec()
+                with lock: self._emit_stats(stats, total)
+                if attempt:
+                    bot.micro_status(f"Retrying '{patient_name}' (attempt {attempt + 1})...")
+                    if bot.termination_event.wait(retry_delay): work.put((index, patient_name, attempt)); QUEUE_DEPTH.inc(); break
+                else:
+                    bot.micro_status(f"Processing '{patient_name}' ({index + 1}/{total})...")
+                bytes_before = bot._bytes_received(); started = time.time()
+                status = bot._process_single_patient(patient_name)
+                PATIENT_SECONDS.observe(time.time() - started, status=status); PATIENTS_TOTAL.inc(status=status); PATIENT_RATE.mark()
+                with lock:
+                    stats['workers'][name] += 1; stats['bytes'] += max(0, bot._bytes_received() - bytes_before)
+                if status == 'Error' and bot.last_failure != 'permanent' and attempt < retry_limit:
+                    # Transient failures go to the back of the queue, so retries run once the first pass is done.
+                    PATIENT_RETRIES.inc(reason=bot.last_failure); QUEUE_DEPTH.inc()
+                    with lock: stats['retried'] += 1
+                    work.put((index, patient_name, attempt + 1)); continue
+                finish(index, patient_name, status)
+            if bot.termination_event.is_set(): print(f"[Bot] Termination detected. {name} stopping.")
+            elif bot.broken: bot.micro_status("Browser could not be recovered; this worker is stopping.")
+
+        try:
+            if len(workers) == 1:
+                run(self)
+            else:
+                threads = [threading.Thread(target=run, args=(w,), daemon=True) for w in workers]
+                for t in threads: t.start()
+                for t in threads: t.join()
+        finally:
+            QUEUE_DEPTH.dec(work.qsize())
+            # Patients waiting on a retry keep their first 'Error'; if every browser was lost, so does the rest.
+            while True:
+                try: index, patient_name, attempt = work.get_nowait()
+                except queue.Empty: break
+                if attempt or not self.termination_event.is_set(): finish(index, patient_name, 'Error')
+            for worker in extra: worker.shutdown()
+            self.label = None
+        self._emit_stats(stats, total)
+        for name, per_minute in self._throughput(stats).items():
+            print(f"[Bot] {name}: {stats['workers'][name]} patients, {per_minute} patients/min")
+        if stats['retried'] or self.recoveries: print(f"[Bot] Retried {stats['retried']} patient(s); browser recoveries: {self.recoveries}.")
+        print(f"[Bot] Step timings: {self.timings.summary()}")
+        print(f"[Bot] Navigation: {self.navigation_summary()}, {round(stats['bytes'] / max(stats['processed'], 1) / 1024, 1)} KB/patient")
+        if self.http_engine: print(f"[Bot] HTTP engine: {self.http_engine.stats}")
+        self.progress.flush()
+        return [r for r in slots if r is not None]
+
+    def _throughput(self, stats):
+        minutes = max(time.time() - stats['started'], 1e-6) / 60
+        return {name: round(count / minutes, 2) for name, count in stats['workers'].items()}
+
+    def _emit_stats(self, stats, total):
+        self.progress.stats({
+            'processed': stats['processed'],
+            'remaining': total - stats['processed'],
+            'workers': self._throughput(stats),
+            'kb_per_patient': round(stats['bytes'] / max(stats['processed'], 1) / 1024, 1)
+        })
 
     def _process_single_patient(self, patient_name):
+        self.last_failure = None; vault_submitted = False
+        entry = None
+        if self.name_index is not None:
+            entry = self.name_index.get(normalize_name(patient_name))
+            if not entry: return 'Not Found'
+        if self.http_engine:
+            with self.waits.step('http_patient'):
+                status = self.http_engine.process(patient_name)
+            # An HTTP 'Error' may come after the vault call went through, so it is never retried.
+            if status == 'Error': self.last_failure = 'permanent'
+            if status: return status
+            self.micro_status(f"HTTP path unavailable for '{patient_name}', using the browser...")
         try:
-            self.micro_status(f"Navigating to Void page for '{patient_name}'")
-            self.driver.get("https://gateway.quantumepay.com/credit-card/void")
-
-            search_successful = False
-            for attempt in range(15):
-                try:
-                    self.micro_status(f"Searching for patient (Attempt {attempt + 1})...")
-                    WebDriverWait(self.driver, 2).until(
-                        EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'table-wrapper')]"))
-                    )
-                    search_box = WebDriverWait(self.driver, 2).until(
-                        EC.element_to_be_clickable((By.XPATH, "//input[@placeholder='Search']"))
-                    )
-                    search_box.click(); time.sleep(0.5)
-                    search_box.clear(); time.sleep(0.5)
-                    search_box.send_keys(patient_name)
-                    search_successful = True
-                    break
-                except Exception:
-                    time.sleep(1)
-
-            if not search_successful:
-                raise Exception("Failed to search for patient.")
-
-            time.sleep(3)
-            self.micro_status("Opening transaction details...")
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.XPATH, f"//tr[contains(., \"{patient_name}\")]//button[@data-v-b6b33fa0]"))
-            ).click()
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.LINK_TEXT, "Transaction Detail"))
-            ).click()
+            if entry and entry.get('href'):
+                self.micro_status(f"Opening indexed transaction for '{patient_name}'")
+                self._navigate(entry['href'])
+            else:
+                self.micro_status(f"Navigating to Void page for '{patient_name}'")
+                self._navigate(f"{GATEWAY_URL}/credit-card/void")
+                if not (entry and entry['page'] == 1 and self._open_indexed_row(patient_name)):
+                    self._search_patient(patient_name)
+                    self._open_row(patient_name)
 
             self.micro_status("Adding to Vault...")
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.XPATH, "//button/span[normalize-space()='Add to Vault']"))
-            ).click()
-            WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                EC.element_to_be_clickable((By.XPATH, "//div[@class='modal-footer']//button/span[normalize-space()='Confirm']"))
-            ).click()
+            self.waits.until('add_to_vault', EC.element_to_be_clickable(
+                (By.XPATH, "//button/span[normalize-space()='Add to Vault']"))).click()
+            vault_confirm = self.waits.until('vault_confirm', EC.element_to_be_clickable(
+                (By.XPATH, "//div[@class='modal-footer']//button/span[normalize-space()='Confirm']")))
+            vault_submitted = True  # set before the click: a crash mid-click may still have submitted the vault
+            vault_confirm.click()
 
+            # These timeouts decide between 'Done' and the final 'Bad' status, so they stay fixed rather than adaptive.
+            save_confirm = (By.XPATH, "//button[.//span[normalize-space()='Confirm']]")
             try:
                 self.micro_status("Verifying success and saving...")
-                company_input = WebDriverWait(self.driver, 10).until(
-                    EC.element_to_be_clickable((By.NAME, "company_name"))
-                )
+                company_input = self.waits.until('company_name', EC.element_to_be_clickable((By.NAME, "company_name")), 10, adaptive=False)
                 company_input.clear()
                 company_input.send_keys(patient_name)
-                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button/span[normalize-space()='Save Changes']"))
-                ).click()
-                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[.//span[normalize-space()='Confirm']]"))
-                ).click()
-                time.sleep(5)
-                return 'Done'
+                self.waits.until('save_changes', EC.element_to_be_clickable(
+                    (By.XPATH, "//button/span[normalize-space()='Save Changes']")), adaptive=False).click()
+                self.waits.until('save_confirm', EC.element_to_be_clickable(save_confirm), adaptive=False).click()
             except TimeoutException:
                 self.micro_status(f"'{patient_name}' is in a bad state, cancelling.")
-                WebDriverWait(self.driver, self.DEFAULT_TIMEOUT).until(
-                    EC.element_to_be_clickable((By.XPATH, "//button[.//span[normalize-space()='Cancel']]"))
-                ).click()
+                self.waits.until('cancel', EC.element_to_be_clickable(
+                    (By.XPATH, "//button[.//span[normalize-space()='Cancel']]"))).click()
                 return 'Bad'
+            # The save is confirmed at this point; a slow modal close or request still counts as 'Done'.
+            try:
+                self.waits.gone('save_modal_closed', save_confirm, adaptive=False)
+                self.waits.network_idle('save_xhr')
+            except TimeoutException:
+                print(f"[Bot] WARNING: save dialog for '{patient_name}' was slow to close after Confirm; recording as Done.")
+            return 'Done'
+        except PatientNotFound:
+            return 'Not Found'
         except Exception as e:
-            print(f"An error occurred while processing {patient_name}: {e}")
+            self.last_failure = classify_failure(e)
+            if self.last_failure == 'driver' or not self._driver_responsive():
+                self.last_failure = 'driver'; self.recover_driver()
+            # Once the vault is confirmed a second attempt would vault the transaction again, whatever failed.
+            if vault_submitted: self.last_failure = 'permanent'
+            print(f"An error occurred while processing {patient_name} ({self.last_failure}): {e}")
             return 'Error'
 
+    def _open_indexed_row(self, patient_name):
+        """Click straight into a row the pre-scan saw on the first page, skipping the search"""
+        try:
+            self.waits.until('table_filtered', lambda d: d.execute_script(TABLE_ROWS_SCRIPT, ''))
+            self._open_row(patient_name, default=5, exact=True)
+            return True
+        except Exception:
+            return False
+
+    def _search_patient(self, patient_name):
+        search_successful = False; network = self.waits.network
+        if network: network.poll(); succeeded, failed = network.succeeded, network.failed
+        for attempt in range(15):
+            try:
+                self.micro_status(f"Searching for patient (Attempt {attempt + 1})...")
+                self.waits.until('table_ready', EC.presence_of_element_located((By.XPATH, "//div[contains(@class, 'table-wrapper')]")), 2)
+                search_box = self.waits.until('search_box', EC.element_to_be_clickable((By.XPATH, "//input[@placeholder='Search']")), 2)
+                search_box.click()
+                search_box.clear()
+                search_box.send_keys(patient_name)
+                search_successful = True
+                break
+            except Exception:
+                SEARCH_RETRIES.inc()
+                self.waits.network_idle(default=2)
+
+        if not search_successful:
+            raise SearchUnavailable("Failed to search for patient.")
+
+        self.waits.network_idle('search_xhr')
+        if self.waits.table_filtered(patient_name) == 'empty':
+            # A failed search XHR renders the same empty table, so 'Not Found' needs a search response that succeeded.
+            if network: network.poll()
+            if not network or network.failed > failed or network.succeeded == succeeded:
+                raise SearchUnavailable("Search returned no rows, but its request did not succeed.")
+            raise PatientNotFound("No transaction found for patient.")
+
+    def _open_row(self, patient_name, default=None, exact=False):
+        self.micro_status("Opening transaction details...")
+        # On an unfiltered table only a cell equal to the name is safe; a contains() match could be another patient.
+        row = f"td[normalize-space(.)=\"{' '.join(patient_name.split())}\"]" if exact else f"contains(., \"{patient_name}\")"
+        self.waits.until('row_button', EC.element_to_be_clickable(
+            (By.XPATH, f"//tr[{row}]//button[@data-v-b6b33fa0]")), default).click()
+        self.waits.until('transaction_detail', EC.element_to_be_clickable((By.LINK_TEXT, "Transaction Detail")), default).click()
+
     def shutdown(self):
         try:
+            if not self.label:
+                self.progress.close()
+                if self.http_engine: self.http_engine.close()
+            if self.driver and self.pooled:
+                self.driver_pool.release(self.driver, self.temp_user_dir, self.temp_cache_dir)
+                self.driver = None; self.pooled = False
+                print("[Bot] Browser returned to the warm pool.")
+                return
             if self.driver:
                 self.driver.quit()
             self._cleanup_temp_dirs()